@@ -0,0 +1,29 @@
+import time
+from django.core.management.base import BaseCommand
+
+REPEAT_HELP = 'Run it from cron, or keep it running with --interval.'
+
+
+class RepeatingCommand(BaseCommand):
+    """
+    Command running `run_once` once, or every --interval seconds, and
+    printing the dict it returns as key=value pairs.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=int, default=0,
+            help='Repeat every INTERVAL seconds instead of running once'
+        )
+
+    def run_once(self, **options):
+        raise NotImplementedError
+
+    def handle(self, *args, **options):
+        while True:
+            result = self.run_once(**options)
+            self.stdout.write(', '.join(f'{key}={value}' for key, value in result.items()))
+
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
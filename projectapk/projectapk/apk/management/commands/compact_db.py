@@ -0,0 +1,19 @@
+from apk.management.base import REPEAT_HELP, RepeatingCommand
+from apk.retention import run_retention
+
+
+class Command(RepeatingCommand):
+    help = (
+        'Apply retention to YouTubeCache and RenameJob rows and vacuum the '
+        f'database. {REPEAT_HELP}'
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            '--no-vacuum', action='store_true',
+            help='Skip the incremental vacuum'
+        )
+
+    def run_once(self, **options):
+        return run_retention(vacuum=not options['no_vacuum'])
@@ -0,0 +1,176 @@
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+
+CSV_FIELDS = ['video_index', 'video_title', 'original_name', 'file_path', 'score', 'method', 'suggested_name']
+
+# Per-process state of the matching workers, set by _init_worker
+_worker = {}
+
+
+def _count_scores(mixin):
+    """Count the calls `mixin` makes to calculate_similarity_score in `mixin.pairs_scored`"""
+    score = mixin.calculate_similarity_score
+    mixin.pairs_scored = 0
+
+    def counted(playlist_title, filename):
+        mixin.pairs_scored += 1
+        return score(playlist_title, filename)
+
+    mixin.calculate_similarity_score = counted
+    return mixin
+
+
+def _init_worker(selected_files, videos, ordinal_pairs):
+    # Spawned workers start without Django; forked ones already have it
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'projectapk.settings')
+    django.setup()
+    from apk.mixins import LocalRenameMixin
+
+    _worker['mixin'] = _count_scores(LocalRenameMixin())
+    _worker['files'] = selected_files
+    _worker['videos'] = videos
+    _worker['ordinal_pairs'] = ordinal_pairs
+
+
+def _match_chunk(bounds):
+    start, end = bounds
+    mixin = _worker['mixin']
+    scored_before = mixin.pairs_scored
+    matches = mixin.process_local_files(
+        _worker['files'], _worker['videos'][start:end], start_index=start,
+        ordinal_pairs=_worker['ordinal_pairs']
+    )
+    return end - start, mixin.pairs_scored - scored_before, matches
+
+
+class Command(BaseCommand):
+    help = (
+        'Match a playlist against local files without the HTTP layer or the '
+        'job table, using all cores, and stream the matches as CSV or NDJSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'playlist',
+            help='Playlist ID or URL, or a JSON file with a list of video titles'
+        )
+        parser.add_argument('paths', nargs='*', help='Files or directories to match')
+        parser.add_argument('--files-from', help='Text file with one file path per line')
+        parser.add_argument('--recursive', action='store_true', help='Descend into subdirectories')
+        parser.add_argument('--output', '-o', default='-', help='Output file (default: stdout)')
+        parser.add_argument(
+            '--format', choices=['csv', 'ndjson'],
+            help='Output format (default: from the output extension, else csv)'
+        )
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Worker processes')
+        parser.add_argument('--chunk-size', type=int, default=50, help='Videos per work unit')
+        parser.add_argument('--api-key', help='YouTube API key (default: saved config)')
+        parser.add_argument('--no-cache', action='store_true', help='Always fetch the playlist')
+
+    def handle(self, *args, **options):
+        from apk.mixins import LocalRenameMixin
+        mixin = _count_scores(LocalRenameMixin())
+
+        videos = self.load_playlist(mixin, options)
+        selected_files = self.collect_files(options)
+        if not videos:
+            raise CommandError('Playlist has no videos')
+        if not selected_files:
+            raise CommandError('No files to match')
+
+        output_format = options['format'] or (
+            'ndjson' if options['output'].endswith(('.ndjson', '.jsonl')) else 'csv'
+        )
+        out = sys.stdout if options['output'] == '-' else open(options['output'], 'w', newline='')
+        writer = csv.DictWriter(out, fieldnames=CSV_FIELDS, extrasaction='ignore') if output_format == 'csv' else None
+        if writer:
+            writer.writeheader()
+
+        chunk_size = max(1, options['chunk_size'])
+        chunks = [(start, min(start + chunk_size, len(videos))) for start in range(0, len(videos), chunk_size)]
+
+        started = time.monotonic()
+        # Linear pass over the whole playlist, so ordinal conflicts between
+        # chunks are seen
+        ordinal_pairs = mixin.match_by_ordinal(selected_files, videos)
+        # Pairs actually scored; ordinal-claimed files are skipped
+        scored = mixin.pairs_scored
+        done = 0
+        matched = 0
+        try:
+            with ProcessPoolExecutor(
+                max_workers=max(1, options['workers']),
+                initializer=_init_worker,
+                initargs=(selected_files, videos, ordinal_pairs)
+            ) as pool:
+                # map() yields in playlist order as soon as each chunk is ready
+                for count, chunk_scored, matches in pool.map(_match_chunk, chunks):
+                    for match in matches:
+                        if writer:
+                            writer.writerow(match)
+                        else:
+                            out.write(json.dumps(match) + '\n')
+                    out.flush()
+
+                    done += count
+                    scored += chunk_scored
+                    matched += len(matches)
+                    elapsed = time.monotonic() - started
+                    self.stderr.write(
+                        f'\rMatched {done}/{len(videos)} videos ({done / len(videos):.0%}), '
+                        f'{matched} matches, {scored / elapsed:,.0f} pairs/s scored',
+                        ending=''
+                    )
+        finally:
+            if out is not sys.stdout:
+                out.close()
+
+        elapsed = time.monotonic() - started
+        pairs = len(videos) * len(selected_files)
+        self.stderr.write('')
+        self.stderr.write(self.style.SUCCESS(
+            f'{len(videos)} videos x {len(selected_files)} files: {scored:,} of {pairs:,} pairs scored '
+            f'in {elapsed:.2f}s ({scored / elapsed:,.0f} pairs/s), {matched} matches'
+        ))
+
+    def load_playlist(self, mixin, options):
+        playlist = options['playlist']
+        if playlist.endswith('.json') and Path(playlist).is_file():
+            with open(playlist, 'r') as f:
+                data = json.load(f)
+            # Exported job or cache entry, or a bare list of titles
+            if isinstance(data, dict):
+                data = data.get('video_titles') or data.get('video_data') or data.get('videos') or []
+            return [str(title) for title in data]
+
+        api_key = options['api_key'] or mixin.get_youtube_api_key()
+        try:
+            return mixin.get_playlist_videos_local(api_key, playlist, use_cache=not options['no_cache'])
+        except Exception as e:
+            if not api_key:
+                raise CommandError('Playlist is not cached and no YouTube API key is configured. Use --api-key.')
+            raise CommandError(f'Could not load playlist: {e}')
+
+    def collect_files(self, options):
+        paths = [Path(p) for p in options['paths']]
+        if options['files_from']:
+            with open(options['files_from'], 'r') as f:
+                paths.extend(Path(line.strip()) for line in f if line.strip())
+
+        selected_files = []
+        for path in paths:
+            if path.is_dir():
+                pattern = '**/*' if options['recursive'] else '*'
+                children = sorted(p for p in path.glob(pattern) if p.is_file() and not p.name.startswith('.'))
+            else:
+                children = [path]
+            selected_files.extend({'name': p.name, 'path': str(p)} for p in children)
+
+        return selected_files
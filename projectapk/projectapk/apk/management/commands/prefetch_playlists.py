@@ -0,0 +1,18 @@
+from apk.management.base import REPEAT_HELP, RepeatingCommand
+from apk.prefetch import run_prefetch
+
+
+class Command(RepeatingCommand):
+    help = (
+        'Refresh the YouTube cache of watched playlists before it expires, '
+        'within the daily quota left above PLAYLIST_PREFETCH_QUOTA_RESERVE. '
+        'Title features are not precomputed, as they only live in the memory '
+        f'of a server process; its own scheduler warms them. {REPEAT_HELP}'
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--api-key', help='YouTube API key (default: saved config)')
+
+    def run_once(self, **options):
+        return run_prefetch(options['api_key'], warm_features=False)
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apk', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='renamejob',
+            name='cancel_requested',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='renamejob',
+            name='next_video_index',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='renamejob',
+            name='status',
+            field=models.CharField(choices=[('pending', 'pending'), ('processing', 'processing'), ('completed', 'completed'), ('failed', 'failed'), ('cancelled', 'cancelled')], default='pending', max_length=20),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apk', '0002_job_checkpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='renamejob',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='youtubecache',
+            name='last_used_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='youtubecache',
+            name='size_bytes',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apk', '0003_retention'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='YouTubeQuotaUsage',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key_hash', models.CharField(max_length=64)),
+                ('day', models.DateField()),
+                ('units', models.IntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('key_hash', 'day')},
+            },
+        ),
+    ]
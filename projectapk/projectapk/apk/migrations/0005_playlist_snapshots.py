@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:10
+
+import hashlib
+import json
+import zlib
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def move_titles_to_snapshots(apps, schema_editor):
+    PlaylistSnapshot = apps.get_model('apk', 'PlaylistSnapshot')
+    RenameJob = apps.get_model('apk', 'RenameJob')
+    YouTubeCache = apps.get_model('apk', 'YouTubeCache')
+
+    def store(titles):
+        payload = json.dumps(list(titles), ensure_ascii=False, separators=(',', ':')).encode()
+        snapshot, _ = PlaylistSnapshot.objects.get_or_create(
+            digest=hashlib.sha256(payload).hexdigest(),
+            defaults={'data': zlib.compress(payload), 'video_count': len(titles)}
+        )
+        return snapshot
+
+    for job in RenameJob.objects.exclude(video_titles=[]):
+        job.snapshot = store(job.video_titles)
+        job.save(update_fields=['snapshot'])
+
+    for entry in YouTubeCache.objects.all():
+        entry.snapshot = store(entry.video_data)
+        entry.size_bytes = len(entry.snapshot.data)
+        entry.save(update_fields=['snapshot', 'size_bytes'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apk', '0004_youtube_quota'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlaylistSnapshot',
+            fields=[
+                ('digest', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('data', models.BinaryField()),
+                ('video_count', models.IntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='renamejob',
+            name='snapshot',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='jobs', to='apk.playlistsnapshot'),
+        ),
+        migrations.AddField(
+            model_name='youtubecache',
+            name='snapshot',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='cache_entries', to='apk.playlistsnapshot'),
+        ),
+        migrations.RunPython(move_titles_to_snapshots, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='renamejob',
+            name='video_titles',
+        ),
+        migrations.RemoveField(
+            model_name='youtubecache',
+            name='video_data',
+        ),
+        migrations.AlterField(
+            model_name='youtubecache',
+            name='snapshot',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='cache_entries', to='apk.playlistsnapshot'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apk', '0005_playlist_snapshots'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WatchedPlaylist',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('playlist_id', models.CharField(max_length=100, unique=True)),
+                ('explicit', models.BooleanField(default=False)),
+                ('last_used_at', models.DateTimeField(blank=True, null=True)),
+                ('last_refreshed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
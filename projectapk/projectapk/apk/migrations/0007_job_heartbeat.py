@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:32
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apk', '0006_watched_playlists'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='renamejob',
+            name='heartbeat_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
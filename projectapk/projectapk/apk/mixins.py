@@ -2,16 +2,27 @@
 import os
 import re
 import json
+import heapq
+import threading
+from collections import OrderedDict
+from datetime import timedelta
 from pathlib import Path
 from difflib import SequenceMatcher
-from googleapiclient.discovery import build
-from .models import YouTubeCache
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from .models import PlaylistSnapshot, RenameJob, YouTubeCache
+from .youtube import YouTubeFetcher
 
 class LocalRenameMixin:
     """
     Mixin containing all renaming helper methods.
     Can be inherited by any view that needs renaming functionality.
     """
+
+    # LRU memo of text_features, shared by the whole process
+    _features_cache = OrderedDict()
+    _features_lock = threading.Lock()
     
     def get_youtube_api_key(self):
         config_path = Path.home()/ '.youtube_renamer' / 'config.json'
@@ -62,24 +73,98 @@ class LocalRenameMixin:
         
         return numbers
         pass
+
+    # Minimum score for a file to be matched to a video
+    MATCH_THRESHOLD = 0.3
+
+    # Patterns that mark a number as an ordinal, most reliable first
+    ORDINAL_PATTERNS = [
+        r'\b(?:episode|ep|part|pt|track|chapter|lesson)\.?\s*#?\s*(\d{1,4})\b',
+        r'#\s*(\d{1,4})\b',
+        r'^\s*(\d{1,4})\s*(?:[-_.):]|\s-\s)(?!\d)',
+    ]
+
+    def extract_ordinal(self, text):
+        """Return the track/episode number of `text`, or None if unclear.
+
+        Only the most reliable pattern that matches is used, and it must
+        yield a single distinct number ("Episode 3 Part 2" is ambiguous).
+        """
+        for pattern in self.ORDINAL_PATTERNS:
+            numbers = {int(n) for n in re.findall(pattern, text.lower())}
+            if numbers:
+                return numbers.pop() if len(numbers) == 1 else None
+        return None
+
+    def match_by_ordinal(self, selected_files, playlist_videos, start_index=0, video_indices=None):
+        """Linear first pass pairing files and videos by ordinal number.
+
+        Only videos whose own title carries an ordinal take part. Ordinals
+        claimed twice on either side are conflicts, and pairs not scoring
+        above MATCH_THRESHOLD are rejected; both are left to the fuzzy
+        scorer. Pass the whole playlist, even when matching it in chunks,
+        so conflicts between chunks are seen.
+        Returns {video_index: (file_index, score, details)}.
+        """
+        videos_by_ordinal = {}
+        for video_index, video_title in self._index_videos(playlist_videos, start_index, video_indices):
+            ordinal = self.extract_ordinal(video_title)
+            if ordinal is not None:
+                videos_by_ordinal.setdefault(ordinal, []).append((video_index, video_title))
+
+        files_by_ordinal = {}
+        for file_index, file_info in enumerate(selected_files):
+            filename = file_info.get('name', '')
+            ordinal = self.extract_ordinal(os.path.splitext(filename)[0]) if filename else None
+            if ordinal is not None:
+                files_by_ordinal.setdefault(ordinal, []).append(file_index)
+
+        pairs = {}
+        for ordinal, videos in videos_by_ordinal.items():
+            files = files_by_ordinal.get(ordinal, [])
+            if len(videos) != 1 or len(files) != 1:
+                continue
+
+            video_index, video_title = videos[0]
+            score, details = self.calculate_similarity_score(video_title, selected_files[files[0]]['name'])
+            if score > self.MATCH_THRESHOLD:
+                pairs[video_index] = (files[0], score, details)
+
+        return pairs
     
+    def text_features(self, text):
+        """Cleaned text, word set and numbers of a title or filename.
+
+        Memoized, as every title is scored against every file. The
+        prefetch scheduler warms it for watched playlists.
+        """
+        with self._features_lock:
+            features = self._features_cache.get(text)
+            if features is not None:
+                self._features_cache.move_to_end(text)
+                return features
+
+        cleaned = self.clean_titles(text)
+        features = (cleaned, frozenset(cleaned.split()), tuple(self.extract_possible_numbers(text)))
+
+        with self._features_lock:
+            self._features_cache[text] = features
+            while len(self._features_cache) > getattr(settings, 'TITLE_FEATURES_CACHE_SIZE', 20000):
+                self._features_cache.popitem(last=False)
+        return features
+
     def calculate_similarity_score(self, playlist_title, filename):
-        clean_playlist = self.clean_titles(playlist_title)
-        clean_filename = self.clean_titles(filename)
+        clean_playlist, playlist_words, playlist_numbers = self.text_features(playlist_title)
+        clean_filename, filename_words, filename_numbers = self.text_features(filename)
         
         similarity = SequenceMatcher(None, clean_playlist, clean_filename).ratio()
         
-        playlist_words = set(clean_playlist.split())
-        filename_words = set(clean_filename.split())
-        
         if playlist_words and filename_words:
             common_words = playlist_words.intersection(filename_words)
             word_overlap = len(common_words) / len(playlist_words.union(filename_words))
         else:
             word_overlap = 0
         
-        playlist_numbers = self.extract_possible_numbers(playlist_title)
-        filename_numbers = self.extract_possible_numbers(filename)
         number_match = 1.0 if (playlist_numbers and filename_numbers and 
                               any(pn in filename_numbers for pn in playlist_numbers)) else 0
         
@@ -101,92 +186,509 @@ class LocalRenameMixin:
         }
         pass
     
-    def get_playlist_videos_local(self, api_key, playlist_url, use_cache=True):
-        youtube = build('youtube', 'v3', developerKey=api_key)
-        
+    def get_playlist_id(self, playlist_url):
         if 'list=' in playlist_url:
-            playlist_id = playlist_url.split('list=')[-1].split('&')[0]
-        else:
-            playlist_id = playlist_url
+            return playlist_url.split('list=')[-1].split('&')[0]
+        return playlist_url
+
+    def iter_playlist_pages(self, api_key, playlist_url, use_cache=True):
+        """Yield playlist video titles page by page, as they are fetched.
+
+        A valid cache entry is yielded as a single page. Once every page
+        has arrived the playlist is written to the cache.
+        """
+        playlist_id = self.get_playlist_id(playlist_url)
         
         if use_cache:
             cache_entry = YouTubeCache.objects.filter(playlist_id=playlist_id).first()
             if cache_entry and cache_entry.is_valid():
-                return cache_entry.video_data
-            
+                YouTubeCache.objects.filter(id=cache_entry.id).update(last_used_at=timezone.now())
+                yield cache_entry.video_data
+                return
         
-        youtube = build('youtube', 'v3', developerKey=api_key)
         videos = []
-        nextPageToken = None
         
         try:
-            while True:
-                pl_request = youtube.playlistItems().list(
-                    part='snippet',
-                    playlistId=playlist_id,
-                    maxResults=50,
-                    pageToken=nextPageToken
-                )
-                pl_response = pl_request.execute()
-                
-                for item in pl_response['items']:
-                    video_title = item['snippet']['title']
-                    videos.append(video_title)
-                
-                nextPageToken = pl_response.get('nextPageToken')
-                if not nextPageToken:
-                    break
-
-            from django.utils import timezone
-            from datetime import timedelta
-
-            YouTubeCache.objects.update_or_create(
-                playlist_id=playlist_id,
-                defaults={
-                    'video_data': videos,
-                    'expires_at': timezone.now() + timedelta(hours=24)
-                }
-            )
-            
-            return videos
-        except Exception as e:
+            for titles in YouTubeFetcher(api_key).iter_playlist_titles(playlist_id):
+                videos.extend(titles)
+                yield titles
+        except Exception:
+            # A stale copy is only usable if nothing was streamed yet
             cache_entry = YouTubeCache.objects.filter(playlist_id=playlist_id).first()
-            if cache_entry:
-                return cache_entry.video_data
-            raise e
+            if cache_entry and not videos:
+                yield cache_entry.video_data
+                return
+            raise
+
+        from datetime import timedelta
+
+        # An unchanged playlist reuses its snapshot, only the dates are written
+        snapshot = PlaylistSnapshot.store(videos)
+        YouTubeCache.objects.update_or_create(
+            playlist_id=playlist_id,
+            defaults={
+                'snapshot': snapshot,
+                'expires_at': timezone.now() + timedelta(hours=24),
+                'last_used_at': timezone.now(),
+                'size_bytes': snapshot.size_bytes
+            }
+        )
+
+    def get_playlist_videos_local(self, api_key, playlist_url, use_cache=True):
+        videos = []
+        for titles in self.iter_playlist_pages(api_key, playlist_url, use_cache):
+            videos.extend(titles)
+        return videos
     
-    def process_local_files(self, selected_files, playlist_videos):
-        """Match local files to playlist videos"""
+    def process_local_files(self, selected_files, playlist_videos, start_index=0, video_indices=None,
+                            ordinal_pairs=None):
+        """Match local files to playlist videos.
+
+        `playlist_videos` may be a slice of the playlist, in which case
+        `start_index` is the playlist position of its first video, or any
+        subset of it with the positions given in `video_indices`.
+
+        Videos paired by `match_by_ordinal` skip the fuzzy scorer, and
+        their files are not offered to other videos. When matching the
+        playlist in parts, pass `ordinal_pairs` computed over all of it;
+        otherwise they are computed for the given videos only.
+
+        Fuzzy matches keep the next best files as `candidates`, up to
+        RENAME_JOB_TOP_K in total, from a bounded heap filled during the
+        same scoring pass. Alternatives of ordinal matches, and claimed
+        files, are ranked on request by `rank_candidates`.
+        """
+        top_k = max(1, getattr(settings, 'RENAME_JOB_TOP_K', 5))
+        if ordinal_pairs is None:
+            ordinal_pairs = self.match_by_ordinal(selected_files, playlist_videos, start_index, video_indices)
+        claimed_files = {file_index for file_index, _, _ in ordinal_pairs.values()}
         matches = []
         
-        for video_index, video_title in enumerate(playlist_videos):
-            best_match = None
-            best_score = 0
+        for video_index, video_title in self._index_videos(playlist_videos, start_index, video_indices):
+            if video_index in ordinal_pairs:
+                file_index, score, details = ordinal_pairs[video_index]
+                matches.append(self._build_match(
+                    video_index, video_title, selected_files[file_index], score, details, 'ordinal'
+                ))
+                continue
+            
+            # Min-heap of the top_k scores; -file_index keeps the earliest
+            # file first among equal scores
+            top = []
             
-            for file_info in selected_files:
+            for file_index, file_info in enumerate(selected_files):
                 filename = file_info.get('name', '')
-                if not filename:
+                if not filename or file_index in claimed_files:
                     continue
                 
                 score, details = self.calculate_similarity_score(video_title, filename)
                 
-                if score > best_score and score > 0.3:  # Threshold
-                    best_score = score
-                    best_match = {
-                        'video_index': video_index,
-                        'video_title': video_title,
-                        'original_name': filename,
-                        'file_path': file_info.get('path', ''),
-                        'score': score,
-                        'details': details,
-                        'suggested_name': f"{video_index+1:03d} - {video_title[:50]}"
-                    }
+                if score > self.MATCH_THRESHOLD:
+                    entry = (score, -file_index, details, file_info)
+                    if len(top) < top_k:
+                        heapq.heappush(top, entry)
+                    elif entry[:2] > top[0][:2]:
+                        heapq.heapreplace(top, entry)
             
-            if best_match:
+            if top:
+                ranked = sorted(top, key=lambda entry: entry[:2], reverse=True)
+                score, _, details, file_info = ranked[0]
+                best_match = self._build_match(video_index, video_title, file_info, score, details, 'fuzzy')
+                best_match['candidates'] = [
+                    self._candidate(file_info, score) for score, _, _, file_info in ranked[1:]
+                ]
                 matches.append(best_match)
         
+        matches.sort(key=lambda match: match['video_index'])
         return matches
 
+    def rank_candidates(self, match, selected_files, all_matches):
+        """Alternatives to `match`, best first, up to RENAME_JOB_TOP_K - 1.
+
+        Scored here, one title against the files, rather than during
+        matching: every other file for an ordinal match, and the files
+        claimed by ordinal pairs for a fuzzy one, next to its stored
+        candidates.
+        """
+        top_k = max(1, getattr(settings, 'RENAME_JOB_TOP_K', 5))
+        own = (match['file_path'], match['original_name'])
+        if match.get('method') == 'ordinal':
+            candidates = []
+            to_score = selected_files
+        else:
+            candidates = list(match.get('candidates', []))
+            claimed = {(m['file_path'], m['original_name']) for m in all_matches if m.get('method') == 'ordinal'}
+            to_score = [f for f in selected_files if (f.get('path', ''), f.get('name', '')) in claimed]
+
+        for file_info in to_score:
+            filename = file_info.get('name', '')
+            if not filename or (file_info.get('path', ''), filename) == own:
+                continue
+            score, _ = self.calculate_similarity_score(match['video_title'], filename)
+            if score > self.MATCH_THRESHOLD:
+                candidates.append(self._candidate(file_info, score))
+
+        # Stable, so stored candidates stay ahead on equal scores
+        candidates.sort(key=lambda candidate: candidate['score'], reverse=True)
+        return candidates[:top_k - 1]
+
+    def _candidate(self, file_info, score):
+        return {
+            'original_name': file_info.get('name', ''),
+            'file_path': file_info.get('path', ''),
+            'score': score
+        }
+
+    def _build_match(self, video_index, video_title, file_info, score, details, method):
+        return {
+            'video_index': video_index,
+            'video_title': video_title,
+            'original_name': file_info.get('name', ''),
+            'file_path': file_info.get('path', ''),
+            'score': score,
+            'details': details,
+            'method': method,
+            'suggested_name': self.suggested_name(video_index, video_title),
+            'candidates': []
+        }
+
+    def suggested_name(self, video_index, video_title):
+        return f"{video_index+1:03d} - {video_title[:50]}"
+
+    def _index_videos(self, playlist_videos, start_index=0, video_indices=None):
+        if video_indices is not None:
+            return zip(video_indices, playlist_videos)
+        return enumerate(playlist_videos, start=start_index)
+
+    def rematch(self, old_videos, old_files, old_matches, playlist_videos, selected_files):
+        """Update earlier matches for a changed playlist and file list.
+
+        Videos are paired with the old playlist by title. Matches of
+        unchanged videos whose file is still selected are reused, with
+        their suggested name renumbered if the video moved. Only new or
+        changed videos and unchanged videos that lost their file are
+        scored against the files no reused match claims; other unmatched
+        videos are only scored against newly added files. Returns the
+        matches and a summary.
+        """
+        old_positions = {}
+        for old_index, title in enumerate(old_videos):
+            old_positions.setdefault(title, []).append(old_index)
+
+        new_index_of = {}
+        changed_videos = []
+        for video_index, title in enumerate(playlist_videos):
+            if old_positions.get(title):
+                new_index_of[old_positions[title].pop(0)] = video_index
+            else:
+                changed_videos.append(video_index)
+
+        def file_key(name, path):
+            return (path or '', name or '')
+
+        current_files = {file_key(f.get('name'), f.get('path')) for f in selected_files}
+        old_file_keys = {file_key(f.get('name'), f.get('path')) for f in old_files}
+        files_added = len(current_files - old_file_keys)
+
+        reused = []
+        claimed_files = set()
+        lost_match = set()
+        for match in old_matches:
+            video_index = new_index_of.get(match['video_index'])
+            if video_index is None:
+                continue
+            key = file_key(match.get('original_name'), match.get('file_path'))
+            if key not in current_files or key in claimed_files:
+                lost_match.add(video_index)
+                continue
+
+            match = dict(match)
+            match['candidates'] = [
+                c for c in match.get('candidates', [])
+                if file_key(c.get('original_name'), c.get('file_path')) in current_files
+            ]
+            if match['video_index'] != video_index:
+                match['video_index'] = video_index
+                match['suggested_name'] = self.suggested_name(video_index, match['video_title'])
+            reused.append(match)
+            claimed_files.add(key)
+
+        matched_videos = {match['video_index'] for match in reused}
+        # New or changed videos, and those that lost their file, are scored
+        # against every unclaimed file; other unmatched videos only against
+        # the added files, the rest already failed to match them
+        full_score = set(changed_videos)
+        added_only = set()
+        for video_index in new_index_of.values():
+            if video_index in matched_videos:
+                continue
+            if video_index in lost_match:
+                full_score.add(video_index)
+            elif files_added:
+                added_only.add(video_index)
+
+        remaining_files = [
+            f for f in selected_files
+            if file_key(f.get('name'), f.get('path')) not in claimed_files
+        ]
+        added_positions = {
+            remaining_index: added_index
+            for added_index, remaining_index in enumerate(
+                i for i, f in enumerate(remaining_files)
+                if file_key(f.get('name'), f.get('path')) not in old_file_keys
+            )
+        }
+        added_files = [remaining_files[i] for i in added_positions]
+
+        # Claims of both groups count in each, so no file is matched twice
+        ordinal_pairs = {
+            video_index: pair
+            for video_index, pair in self.match_by_ordinal(remaining_files, playlist_videos).items()
+            if video_index in full_score or (video_index in added_only and pair[0] in added_positions)
+        }
+        added_pairs = {
+            video_index: (added_positions[file_index], score, details)
+            for video_index, (file_index, score, details) in ordinal_pairs.items()
+            if file_index in added_positions
+        }
+
+        new_matches = []
+        for files, videos, pairs in (
+            (remaining_files, sorted(full_score), ordinal_pairs),
+            (added_files, sorted(added_only), added_pairs),
+        ):
+            if videos:
+                new_matches.extend(self.process_local_files(
+                    files,
+                    [playlist_videos[i] for i in videos],
+                    video_indices=videos,
+                    ordinal_pairs=pairs
+                ))
+
+        matches = sorted(reused + new_matches, key=lambda match: match['video_index'])
+        return matches, {
+            'videos_added': len(changed_videos),
+            'videos_removed': len(old_videos) - len(new_index_of),
+            'files_added': files_added,
+            'files_removed': len(old_file_keys - current_files),
+            'matches_reused': len(reused),
+            'videos_scored': len(full_score) + len(added_only)
+        }
+
+    def orphaned_jobs(self):
+        """
+        Filter for pending or processing jobs whose worker stopped sending
+        heartbeats, e.g. because the server was restarted. Jobs are
+        claimed through the database, as several server processes may run
+        workers.
+        """
+        stale_before = timezone.now() - timedelta(seconds=getattr(settings, 'RENAME_JOB_STALE_SECONDS', 600))
+        return Q(status__in=('pending', 'processing'), heartbeat_at__lt=stale_before)
+
+    def start_job_thread(self, job_id, api_key):
+        threading.Thread(
+            target=self._process_job_background,
+            args=(job_id, api_key),
+            daemon=True
+        ).start()
+
+    def start_rematch_thread(self, job_id, api_key, selected_files=None):
+        threading.Thread(
+            target=self._rematch_job_background,
+            args=(job_id, api_key, selected_files),
+            daemon=True
+        ).start()
+
+    def _complete_job(self, job, extra_statistics=None, update_fields=()):
+        """Build rename commands and statistics from `job.matches` and save.
+
+        The save only happens if no cancel request arrived meanwhile, which
+        may have been made through another server process. Returns False
+        if one did.
+        """
+        # Prepare rename commands for Flutter
+        rename_commands = []
+        for match in job.matches:
+            rename_commands.append({
+                'original_path': match['file_path'],
+                'new_name': match['suggested_name'],
+                'video_title': match['video_title'],
+                'confidence': match['score']
+            })
+
+        # Update job
+        job.status = 'completed'
+        job.completed_at = timezone.now()
+        job.rename_commands = rename_commands
+        job.statistics = {
+            'total_files': len(job.selected_files),
+            'total_videos': job.video_count,
+            'matches_found': len(job.matches),
+            'success_rate': len(job.matches) / len(job.selected_files) if job.selected_files else 0,
+            **(extra_statistics or {})
+        }
+        fields = ['status', 'completed_at', 'rename_commands', 'statistics', *update_fields]
+        return bool(RenameJob.objects.filter(id=job.id, cancel_requested=False).update(
+            **{name: getattr(job, name) for name in fields}
+        ))
+
+    def _process_job_background(self, job_id, api_key):
+        """Process job in background thread.
+
+        Videos are matched in chunks of RENAME_JOB_CHUNK_SIZE. After each
+        chunk the partial matches and `next_video_index` are saved, so an
+        interrupted job resumes from its last checkpoint, and a pending
+        cancel request is honoured before the next chunk starts. Each
+        checkpoint also refreshes the job's heartbeat.
+        """
+        # Only the worker that moves the job out of pending runs it
+        if not RenameJob.objects.filter(id=job_id, status='pending').update(
+            status='processing', heartbeat_at=timezone.now()
+        ):
+            return
+
+        try:
+            job = RenameJob.objects.get(id=job_id)
+            videos = list(job.video_titles)
+            if not videos:
+                # The snapshot is only stored once every page has arrived. A
+                # checkpoint without one was matched against a playlist that
+                # may have changed since, so matching starts over.
+                job.matches = []
+                job.next_video_index = 0
+                job.save(update_fields=['matches', 'next_video_index'])
+
+            chunk_size = getattr(settings, 'RENAME_JOB_CHUNK_SIZE', 50)
+
+            # Fetch once, matching full chunks while later pages are still
+            # arriving; resumed jobs keep matching against the same snapshot
+            if not videos:
+                # Ordinal pairs in effect when a chunk was matched
+                streamed_claims = {}
+                for titles in self.iter_playlist_pages(api_key, job.playlist_url):
+                    videos.extend(titles)
+                    ordinal_pairs = self.match_by_ordinal(job.selected_files, videos)
+                    matched_before = job.next_video_index
+                    if not self._match_chunks(job, videos, chunk_size, ordinal_pairs):
+                        return
+                    if job.next_video_index > matched_before:
+                        streamed_claims.update(
+                            (video_index, file_index) for video_index, (file_index, _, _) in ordinal_pairs.items()
+                        )
+                job.snapshot = PlaylistSnapshot.store(videos)
+                job.save(update_fields=['snapshot'])
+
+                ordinal_pairs = self.match_by_ordinal(job.selected_files, videos)
+                if self._ordinal_claims_changed(job, streamed_claims, ordinal_pairs):
+                    job.matches = []
+                    job.next_video_index = 0
+            else:
+                ordinal_pairs = self.match_by_ordinal(job.selected_files, videos)
+
+            if not self._match_chunks(job, videos, chunk_size, ordinal_pairs, final=True):
+                return
+
+            if not self._complete_job(job):
+                RenameJob.objects.filter(id=job_id).update(status='cancelled')
+
+        except Exception as e:
+            # Checkpoint is kept so the job can be resumed
+            RenameJob.objects.filter(id=job_id, status='processing').update(
+                status='failed',
+                statistics={'error': str(e)}
+            )
+
+    def _rematch_job_background(self, job_id, api_key, selected_files=None):
+        """Re-run a completed job against the current playlist in a background thread.
+
+        See `rematch`. If it fails the previous results are left in place.
+        The caller has already moved the job to processing.
+        """
+        statistics = {}
+        try:
+            job = RenameJob.objects.get(id=job_id)
+            statistics = job.statistics
+
+            videos = self.get_playlist_videos_local(api_key, job.playlist_url, use_cache=False)
+            if selected_files is None:
+                selected_files = job.selected_files
+
+            # Same snapshot and files: nothing to rescore or renumber
+            if PlaylistSnapshot.digest_for(videos) == job.snapshot_id and selected_files == job.selected_files:
+                RenameJob.objects.filter(id=job_id).update(
+                    status='completed',
+                    statistics={**statistics, 'rematch': {'unchanged': True}}
+                )
+                return
+
+            job.matches, summary = self.rematch(
+                job.video_titles, job.selected_files, job.matches, videos, selected_files
+            )
+            job.snapshot = PlaylistSnapshot.store(videos)
+            job.selected_files = selected_files
+            job.next_video_index = len(videos)
+            completed = self._complete_job(
+                job, {'rematch': summary},
+                update_fields=['matches', 'snapshot', 'selected_files', 'next_video_index']
+            )
+            if not completed:
+                # Cancelled rematch: the previous results stay
+                RenameJob.objects.filter(id=job_id).update(
+                    status='completed',
+                    cancel_requested=False,
+                    statistics={**statistics, 'rematch_cancelled': True}
+                )
+
+        except Exception as e:
+            RenameJob.objects.filter(id=job_id).update(
+                status='completed',
+                statistics={**statistics, 'rematch_error': str(e)}
+            )
+
+    def _ordinal_claims_changed(self, job, streamed_claims, ordinal_pairs):
+        """Whether chunks matched while pages streamed in must be redone.
+
+        Later pages can turn an ordinal pair into a conflict, freeing its
+        file, or pair a file an earlier fuzzy match already took.
+        """
+        if any(ordinal_pairs.get(video_index, (None,))[0] != file_index
+               for video_index, file_index in streamed_claims.items()):
+            return True
+
+        new_claims = {file_index for file_index, _, _ in ordinal_pairs.values()} - set(streamed_claims.values())
+        taken = {
+            (match['file_path'], match['original_name'])
+            for match in job.matches if match['method'] == 'fuzzy'
+        }
+        return any(
+            (job.selected_files[file_index].get('path', ''), job.selected_files[file_index].get('name', '')) in taken
+            for file_index in new_claims
+        )
+
+    def _match_chunks(self, job, videos, chunk_size, ordinal_pairs, final=False):
+        """Match and checkpoint every full chunk of `videos` not matched yet.
+
+        `ordinal_pairs` come from `match_by_ordinal` over all of `videos`.
+        With `final` the trailing partial chunk is matched too. Returns
+        False if the job was cancelled instead.
+        """
+        while (job.next_video_index < len(videos) if final
+               else len(videos) - job.next_video_index >= chunk_size):
+            if RenameJob.objects.filter(id=job.id, cancel_requested=True).exists():
+                RenameJob.objects.filter(id=job.id).update(status='cancelled')
+                return False
+
+            start = job.next_video_index
+            end = min(start + chunk_size, len(videos))
+            job.matches.extend(self.process_local_files(
+                job.selected_files, videos[start:end], start_index=start, ordinal_pairs=ordinal_pairs
+            ))
+            job.next_video_index = end
+            job.heartbeat_at = timezone.now()
+            job.save(update_fields=['matches', 'next_video_index', 'heartbeat_at'])
+
+        return True
+
     
     #def _process_job_async(self, job_id):
        # def process():
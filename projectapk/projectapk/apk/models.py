@@ -1,5 +1,46 @@
 from django.db import models
+from django.utils import timezone
+import hashlib
+import json
 import uuid
+import zlib
+
+
+class PlaylistSnapshot(models.Model):
+    """Immutable list of video titles, stored once and addressed by its hash"""
+    digest = models.CharField(max_length=64, primary_key=True)
+    # zlib-compressed JSON list of titles
+    data = models.BinaryField()
+    video_count = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    @staticmethod
+    def encode(titles):
+        return json.dumps(list(titles), ensure_ascii=False, separators=(',', ':')).encode()
+
+    @classmethod
+    def digest_for(cls, titles):
+        return hashlib.sha256(cls.encode(titles)).hexdigest()
+
+    @classmethod
+    def store(cls, titles):
+        """Return the snapshot of `titles`, creating it only if it is new"""
+        payload = cls.encode(titles)
+        snapshot, _ = cls.objects.get_or_create(
+            digest=hashlib.sha256(payload).hexdigest(),
+            defaults={'data': zlib.compress(payload), 'video_count': len(titles)}
+        )
+        return snapshot
+
+    @property
+    def titles(self):
+        if not hasattr(self, '_titles'):
+            self._titles = json.loads(zlib.decompress(self.data))
+        return self._titles
+
+    @property
+    def size_bytes(self):
+        return len(self.data)
 
 
 class RenameJob(models.Model):
@@ -8,6 +49,7 @@ class RenameJob(models.Model):
         ('processing', 'processing'),
         ('completed', 'completed'),
         ('failed', 'failed'),
+        ('cancelled', 'cancelled'),
     ]
 
     job_id = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
@@ -20,22 +62,71 @@ class RenameJob(models.Model):
     rename_commands = models.JSONField(default=list)
     statistics = models.JSONField(default=dict)
     playlist_title = models.CharField(max_length=255, blank=True)
-    video_titles = models.JSONField(default=list)
+    snapshot = models.ForeignKey(
+        PlaylistSnapshot, null=True, blank=True,
+        on_delete=models.PROTECT, related_name='jobs'
+    )
+    # Checkpoint: index of the next playlist video still to be matched
+    next_video_index = models.IntegerField(default=0)
+    cancel_requested = models.BooleanField(default=False)
+    # Refreshed by the worker at each checkpoint; a stale one means no
+    # worker is left to finish or cancel the job
+    heartbeat_at = models.DateTimeField(default=timezone.now)
+    # Set once retention has stripped the heavy JSON fields
+    archived_at = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
         return f"Job {self.id} - {self.status}"
 
+    # Set through snapshot, with PlaylistSnapshot.store(titles)
+    @property
+    def video_titles(self):
+        return self.snapshot.titles if self.snapshot_id else []
+
+    @property
+    def video_count(self):
+        return self.snapshot.video_count if self.snapshot_id else 0
+
     class Meta:
         ordering = ['-created_at']
 
 
 class YouTubeCache(models.Model):
     playlist_id = models.CharField(max_length=100, unique=True)
-    video_data = models.JSONField()
+    snapshot = models.ForeignKey(
+        PlaylistSnapshot, on_delete=models.PROTECT, related_name='cache_entries'
+    )
     fetched_at = models.DateTimeField(auto_now=True)
     expires_at = models.DateTimeField()
+    # Bookkeeping for size-bounded LRU retention
+    last_used_at = models.DateTimeField(null=True, blank=True)
+    size_bytes = models.IntegerField(default=0)
+
+    @property
+    def video_data(self):
+        return self.snapshot.titles
 
-    def is_vaild(self):
-        from django.utils import timezone
+    def is_valid(self):
         return timezone.now() < self.expires_at
 
+
+class YouTubeQuotaUsage(models.Model):
+    # sha256 of the API key, the key itself is never stored
+    key_hash = models.CharField(max_length=64)
+    # YouTube quota day, which resets at midnight Pacific time
+    day = models.DateField()
+    units = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = [('key_hash', 'day')]
+
+
+class WatchedPlaylist(models.Model):
+    """Playlist whose cache the prefetch scheduler keeps warm"""
+    playlist_id = models.CharField(max_length=100, unique=True)
+    # Registered by the user; otherwise watched because it was used recently
+    explicit = models.BooleanField(default=False)
+    last_used_at = models.DateTimeField(null=True, blank=True)
+    # Also set when a refresh starts, as a claim other processes respect
+    last_refreshed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
@@ -0,0 +1,169 @@
+# prefetch.py
+import logging
+import math
+import threading
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from .mixins import LocalRenameMixin
+from .models import WatchedPlaylist, YouTubeCache
+from .youtube import QuotaExceeded, YouTubeFetcher
+
+logger = logging.getLogger(__name__)
+
+
+def touch_playlist(playlist_id):
+    """Mark a playlist as recently used, which makes it watched"""
+    now = timezone.now()
+    # Plain UPDATE first, not update_or_create (see DATABASES in settings)
+    if not WatchedPlaylist.objects.filter(playlist_id=playlist_id).update(last_used_at=now):
+        WatchedPlaylist.objects.get_or_create(playlist_id=playlist_id, defaults={'last_used_at': now})
+
+
+def watched_playlists(now=None):
+    now = now or timezone.now()
+    recent_cutoff = now - timedelta(days=getattr(settings, 'WATCHED_PLAYLIST_RECENT_DAYS', 7))
+    return WatchedPlaylist.objects.filter(Q(explicit=True) | Q(last_used_at__gte=recent_cutoff))
+
+
+def due_playlists(now=None):
+    """Watched playlists with no cache entry or one expiring soon, most urgent first.
+
+    Returns (playlist_id, estimated pages) pairs.
+    """
+    now = now or timezone.now()
+    refresh_before = now + timedelta(hours=getattr(settings, 'PLAYLIST_PREFETCH_LEAD_HOURS', 2))
+    playlist_ids = list(watched_playlists(now).values_list('playlist_id', flat=True))
+
+    cached = {
+        entry['playlist_id']: entry
+        for entry in YouTubeCache.objects.filter(playlist_id__in=playlist_ids).values(
+            'playlist_id', 'expires_at', 'snapshot__video_count'
+        )
+    }
+
+    due = []
+    for playlist_id in playlist_ids:
+        entry = cached.get(playlist_id)
+        if entry and entry['expires_at'] > refresh_before:
+            continue
+        expires_at = entry['expires_at'] if entry else None
+        pages = max(1, math.ceil(entry['snapshot__video_count'] / 50)) if entry else 1
+        due.append((expires_at, playlist_id, pages))
+
+    # Missing entries first, then the ones expiring soonest
+    due.sort(key=lambda item: (item[0] is not None, item[0] or now))
+    return [(playlist_id, pages) for _, playlist_id, pages in due]
+
+
+def claim_playlist(playlist_id, now=None):
+    """Claim a playlist for refresh, unless another process just did.
+
+    A conditional UPDATE, so of several server processes running their
+    scheduler at once only one fetches each playlist.
+    """
+    now = now or timezone.now()
+    claimed_before = now - timedelta(seconds=getattr(settings, 'PLAYLIST_PREFETCH_CLAIM_SECONDS', 300))
+    return bool(
+        WatchedPlaylist.objects.filter(playlist_id=playlist_id)
+        .filter(Q(last_refreshed_at__isnull=True) | Q(last_refreshed_at__lt=claimed_before))
+        .update(last_refreshed_at=now)
+    )
+
+
+def run_prefetch(api_key=None, warm_features=True):
+    """Refresh due playlists within the quota left above the reserve.
+
+    With `warm_features` the title features of refreshed playlists are
+    computed into this process's memo, which only helps a server process.
+    """
+    mixin = LocalRenameMixin()
+    api_key = api_key or mixin.get_youtube_api_key()
+    if not api_key:
+        return {'skipped': 'no YouTube API key'}
+
+    now = timezone.now()
+    recent_cutoff = now - timedelta(days=getattr(settings, 'WATCHED_PLAYLIST_RECENT_DAYS', 7))
+    dropped, _ = WatchedPlaylist.objects.filter(explicit=False, last_used_at__lt=recent_cutoff).delete()
+
+    reserve = getattr(settings, 'PLAYLIST_PREFETCH_QUOTA_RESERVE', 2000)
+    refresh_before = now + timedelta(hours=getattr(settings, 'PLAYLIST_PREFETCH_LEAD_HOURS', 2))
+    refreshed = failed = over_budget = recently_claimed = 0
+
+    for playlist_id, pages in due_playlists(now):
+        remaining = YouTubeFetcher.quota_status(api_key)['remaining']
+        if remaining - pages * YouTubeFetcher.PLAYLIST_ITEMS_COST < reserve:
+            over_budget += 1
+            continue
+
+        if not claim_playlist(playlist_id):
+            recently_claimed += 1
+            continue
+
+        try:
+            titles = mixin.get_playlist_videos_local(api_key, playlist_id, use_cache=False)
+        except QuotaExceeded:
+            break
+        except Exception:
+            logger.exception('Prefetch of playlist %s failed', playlist_id)
+            failed += 1
+            continue
+
+        # A failed fetch falls back to the stale entry, which is still due
+        if not YouTubeCache.objects.filter(playlist_id=playlist_id, expires_at__gt=refresh_before).exists():
+            failed += 1
+            continue
+
+        if warm_features:
+            for title in titles:
+                mixin.text_features(title)
+        WatchedPlaylist.objects.filter(playlist_id=playlist_id).update(last_refreshed_at=timezone.now())
+        refreshed += 1
+
+    return {
+        'refreshed': refreshed,
+        'failed': failed,
+        'over_budget': over_budget,
+        'recently_claimed': recently_claimed,
+        'dropped_recent': dropped
+    }
+
+
+class PrefetchScheduler:
+    """
+    Background thread of the server process running `run_prefetch` every
+    PLAYLIST_PREFETCH_INTERVAL seconds. Started on first use; it reuses
+    the API key of the latest request, kept in memory only. Each worker
+    process of a multi-process server runs one, see `claim_playlist`.
+    """
+
+    _lock = threading.Lock()
+    _thread = None
+    _api_key = None
+
+    @classmethod
+    def ensure_started(cls, api_key=None):
+        interval = getattr(settings, 'PLAYLIST_PREFETCH_INTERVAL', 600)
+        with cls._lock:
+            if api_key:
+                cls._api_key = api_key
+            if interval <= 0 or (cls._thread and cls._thread.is_alive()):
+                return
+            cls._thread = threading.Thread(target=cls._run, args=(interval,), daemon=True)
+            cls._thread.start()
+
+    @classmethod
+    def _run(cls, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                run_prefetch(cls._api_key)
+            except Exception:
+                logger.exception('Playlist prefetch run failed')
+
+
+def note_playlist_use(playlist_id, api_key=None):
+    touch_playlist(playlist_id)
+    PrefetchScheduler.ensure_started(api_key)
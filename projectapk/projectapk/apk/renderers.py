@@ -0,0 +1,102 @@
+# renderers.py
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import msgpack
+except ImportError:  # optional, only needed for the binary format
+    msgpack = None
+
+
+class _StringTable:
+    """Deduplicated list of strings, referenced by index"""
+
+    def __init__(self):
+        self.values = []
+        self._index = {}
+
+    def index(self, value):
+        if value not in self._index:
+            self._index[value] = len(self.values)
+            self.values.append(value)
+        return self._index[value]
+
+
+def to_columnar(data):
+    """
+    Turn the `rename_commands` and `matches` lists of a job payload into
+    parallel arrays. File paths and video titles are stored once in the
+    `paths` and `titles` tables and referenced by index. The candidates
+    of each match become one list per column.
+    """
+    if isinstance(data, list):
+        return [to_columnar(item) for item in data]
+    if not isinstance(data, dict) or not ('matches' in data or 'rename_commands' in data):
+        return data
+
+    data = dict(data)
+    paths = _StringTable()
+    titles = _StringTable()
+
+    commands = data.get('rename_commands')
+    if isinstance(commands, list):
+        data['rename_commands'] = {
+            'path': [paths.index(c.get('original_path', '')) for c in commands],
+            'new_name': [c.get('new_name') for c in commands],
+            'title': [titles.index(c.get('video_title', '')) for c in commands],
+            'confidence': [float(c.get('confidence', 0)) for c in commands],
+        }
+
+    matches = data.get('matches')
+    if isinstance(matches, list):
+        detail_keys = sorted({key for m in matches for key in m.get('details', {})})
+        data['matches'] = {
+            'video_index': [m.get('video_index') for m in matches],
+            'title': [titles.index(m.get('video_title', '')) for m in matches],
+            'path': [paths.index(m.get('file_path', '')) for m in matches],
+            'original_name': [m.get('original_name') for m in matches],
+            'score': [float(m.get('score', 0)) for m in matches],
+            'method': [m.get('method') for m in matches],
+            'suggested_name': [m.get('suggested_name') for m in matches],
+            'details': {
+                key: [m.get('details', {}).get(key) for m in matches] for key in detail_keys
+            },
+            'candidates': {
+                'path': [[paths.index(c.get('file_path', '')) for c in m.get('candidates', [])] for m in matches],
+                'original_name': [[c.get('original_name') for c in m.get('candidates', [])] for m in matches],
+                'score': [[float(c.get('score', 0)) for c in m.get('candidates', [])] for m in matches],
+            },
+        }
+
+    data['paths'] = paths.values
+    data['titles'] = titles.values
+    data['format'] = 'columnar'
+    return data
+
+
+class ColumnarJSONRenderer(JSONRenderer):
+    """Selected with `?format=columnar` or the media type in `Accept`"""
+    media_type = 'application/vnd.playorder.columnar+json'
+    format = 'columnar'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return super().render(to_columnar(data), accepted_media_type, renderer_context)
+
+
+class ColumnarMessagePackRenderer(BaseRenderer):
+    """Selected with `?format=msgpack` or the media type in `Accept`"""
+    media_type = 'application/vnd.playorder.columnar+msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        # Datetimes, UUIDs etc. are encoded the same way as in JSON
+        return msgpack.packb(to_columnar(data), default=JSONEncoder().default)
+
+
+COLUMNAR_RENDERERS = [ColumnarJSONRenderer]
+if msgpack is not None:
+    COLUMNAR_RENDERERS.append(ColumnarMessagePackRenderer)
@@ -0,0 +1,119 @@
+# retention.py
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+from .models import PlaylistSnapshot, RenameJob, YouTubeCache
+
+FINISHED_STATUSES = ('completed', 'failed', 'cancelled')
+
+
+def prune_youtube_cache(now=None):
+    """Drop long-expired entries, then evict LRU entries above the size budget"""
+    now = now or timezone.now()
+    stale_days = getattr(settings, 'YOUTUBE_CACHE_STALE_DAYS', 7)
+    max_bytes = getattr(settings, 'YOUTUBE_CACHE_MAX_BYTES', 50 * 1024 * 1024)
+
+    expired, _ = YouTubeCache.objects.filter(
+        expires_at__lt=now - timedelta(days=stale_days)
+    ).delete()
+
+    # Entries written before size tracking existed
+    for entry in YouTubeCache.objects.filter(size_bytes=0).select_related('snapshot'):
+        YouTubeCache.objects.filter(id=entry.id).update(size_bytes=entry.snapshot.size_bytes)
+
+    total = YouTubeCache.objects.aggregate(total=Sum('size_bytes'))['total'] or 0
+    evict_ids = []
+    if total > max_bytes:
+        entries = YouTubeCache.objects.order_by(
+            F('last_used_at').asc(nulls_first=True), 'fetched_at'
+        ).values_list('id', 'size_bytes')
+        for entry_id, size in entries:
+            if total <= max_bytes:
+                break
+            evict_ids.append(entry_id)
+            total -= size
+        YouTubeCache.objects.filter(id__in=evict_ids).delete()
+
+    return {
+        'cache_expired_deleted': expired,
+        'cache_evicted': len(evict_ids),
+        'cache_bytes': total
+    }
+
+
+def prune_rename_jobs(now=None):
+    """Archive heavy fields of old finished jobs and delete the oldest ones"""
+    now = now or timezone.now()
+    archive_days = getattr(settings, 'RENAME_JOB_ARCHIVE_DAYS', 30)
+    delete_days = getattr(settings, 'RENAME_JOB_DELETE_DAYS', 180)
+    max_count = getattr(settings, 'RENAME_JOB_MAX_COUNT', 1000)
+
+    # Jobs whose worker died that long ago count as finished too
+    finished = RenameJob.objects.filter(
+        Q(status__in=FINISHED_STATUSES) |
+        Q(status__in=('pending', 'processing'), heartbeat_at__lt=now - timedelta(days=archive_days))
+    )
+
+    deleted, _ = finished.filter(created_at__lt=now - timedelta(days=delete_days)).delete()
+
+    overflow_ids = list(
+        finished.order_by('-created_at').values_list('id', flat=True)[max_count:]
+    )
+    if overflow_ids:
+        overflow, _ = RenameJob.objects.filter(id__in=overflow_ids).delete()
+        deleted += overflow
+
+    # rename_commands and statistics stay, they are the job's result
+    archived = finished.filter(
+        archived_at__isnull=True,
+        created_at__lt=now - timedelta(days=archive_days)
+    ).update(
+        selected_files=[],
+        matches=[],
+        snapshot=None,
+        archived_at=now
+    )
+
+    return {
+        'jobs_deleted': deleted,
+        'jobs_archived': archived
+    }
+
+
+def prune_snapshots(now=None):
+    """Delete playlist snapshots no job or cache entry refers to anymore"""
+    now = now or timezone.now()
+    # The grace period covers snapshots stored by a job not saved yet
+    deleted, _ = PlaylistSnapshot.objects.filter(
+        jobs__isnull=True,
+        cache_entries__isnull=True,
+        created_at__lt=now - timedelta(hours=1)
+    ).delete()
+    return {'snapshots_deleted': deleted}
+
+
+def incremental_vacuum():
+    """Give freed SQLite pages back to the filesystem"""
+    if connection.vendor != 'sqlite':
+        return False
+
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA auto_vacuum')
+        if cursor.fetchone()[0] != 2:
+            # Switching to incremental mode only takes effect after a full VACUUM
+            cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            cursor.execute('VACUUM')
+        cursor.execute('PRAGMA incremental_vacuum')
+    return True
+
+
+def run_retention(vacuum=True):
+    now = timezone.now()
+    result = {}
+    result.update(prune_youtube_cache(now))
+    result.update(prune_rename_jobs(now))
+    result.update(prune_snapshots(now))
+    result['vacuumed'] = incremental_vacuum() if vacuum else False
+    return result
@@ -15,7 +15,11 @@ class RenameJobSerializer(serializers.ModelSerializer):
             'rename_commands',
             'statistics',
             'playlist_title',
-            'video_titles'
+            'video_titles',
+            'snapshot',
+            'next_video_index',
+            'cancel_requested',
+            'archived_at'
         ]
         read_only_fields = [
             'job_id',
@@ -24,5 +28,9 @@ class RenameJobSerializer(serializers.ModelSerializer):
             'completed_at',
             'matches',
             'rename_commands',
-            'statistics'
+            'statistics',
+            'snapshot',
+            'next_video_index',
+            'cancel_requested',
+            'archived_at'
         ]
\ No newline at end of file
@@ -1,3 +1,464 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
+from unittest import mock
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import override_settings
+from django.utils import timezone
+from googleapiclient.errors import HttpError
+from httplib2 import Response
+from .mixins import LocalRenameMixin
+from .models import PlaylistSnapshot, RenameJob, WatchedPlaylist, YouTubeCache
+from .prefetch import claim_playlist, due_playlists
+from .renderers import ColumnarJSONRenderer, to_columnar
+from .retention import prune_rename_jobs, prune_snapshots, prune_youtube_cache
+from .youtube import QuotaExceeded, YouTubeFetcher
 
-# Create your tests here.
+
+def make_files(*names):
+    return [{'name': name, 'path': f'/music/{name}'} for name in names]
+
+
+class ExtractOrdinalTests(SimpleTestCase):
+    def setUp(self):
+        self.mixin = LocalRenameMixin()
+
+    def test_keyword_ordinals(self):
+        self.assertEqual(self.mixin.extract_ordinal('Episode 12 - The End'), 12)
+        self.assertEqual(self.mixin.extract_ordinal('Ep.3 Pilot'), 3)
+        self.assertEqual(self.mixin.extract_ordinal('Lesson #7'), 7)
+
+    def test_leading_track_numbers(self):
+        self.assertEqual(self.mixin.extract_ordinal('01 - Hotel California'), 1)
+        self.assertEqual(self.mixin.extract_ordinal('012_intro'), 12)
+
+    def test_ambiguous_or_missing(self):
+        self.assertIsNone(self.mixin.extract_ordinal('Episode 3 Part 2'))
+        self.assertIsNone(self.mixin.extract_ordinal('Hotel California'))
+
+
+class OrdinalMatchingTests(SimpleTestCase):
+    def setUp(self):
+        self.mixin = LocalRenameMixin()
+
+    def test_unnumbered_titles_are_matched_by_name(self):
+        videos = ['Bohemian Rhapsody', 'Hotel California', 'Stairway to Heaven']
+        files = make_files(
+            '01 - Hotel California.mp3', '02 - Stairway to Heaven.mp3', '03 - Bohemian Rhapsody.mp3'
+        )
+
+        matches = self.mixin.process_local_files(files, videos)
+
+        self.assertEqual(
+            [(match['video_title'], match['original_name'], match['method']) for match in matches],
+            [
+                ('Bohemian Rhapsody', '03 - Bohemian Rhapsody.mp3', 'fuzzy'),
+                ('Hotel California', '01 - Hotel California.mp3', 'fuzzy'),
+                ('Stairway to Heaven', '02 - Stairway to Heaven.mp3', 'fuzzy'),
+            ]
+        )
+
+    def test_ordinal_pair_below_threshold_is_rejected(self):
+        pairs = self.mixin.match_by_ordinal(make_files('01 - Hotel California.mp3'), ['Episode 1 - Pilot'])
+        self.assertEqual(pairs, {})
+
+    def test_numbered_titles_are_matched_by_ordinal(self):
+        videos = ['Course Episode 1 - Setup', 'Course Episode 2 - Models']
+        files = make_files('course ep 2 models.mp4', 'course ep 1 setup.mp4')
+
+        matches = self.mixin.process_local_files(files, videos)
+
+        self.assertEqual(
+            [(match['original_name'], match['method']) for match in matches],
+            [('course ep 1 setup.mp4', 'ordinal'), ('course ep 2 models.mp4', 'ordinal')]
+        )
+
+    def test_claimed_files_are_not_rescored(self):
+        videos = ['Course Episode 1 - Setup', 'Course Setup Recap']
+        files = make_files('course ep 1 setup.mp4', 'course setup recap.mp4')
+
+        with mock.patch.object(
+            self.mixin, 'calculate_similarity_score', wraps=self.mixin.calculate_similarity_score
+        ) as score:
+            first, second = self.mixin.process_local_files(files, videos)
+
+        self.assertEqual((first['original_name'], first['method']), ('course ep 1 setup.mp4', 'ordinal'))
+        self.assertEqual((second['original_name'], second['method']), ('course setup recap.mp4', 'fuzzy'))
+        self.assertEqual((first['candidates'], second['candidates']), ([], []))
+        # The ordinal pair, then the leftover video against the leftover file
+        self.assertEqual(
+            [call.args for call in score.call_args_list],
+            [('Course Episode 1 - Setup', 'course ep 1 setup.mp4'), ('Course Setup Recap', 'course setup recap.mp4')]
+        )
+
+    def test_rank_candidates_includes_claimed_files(self):
+        videos = ['Course Episode 1 - Setup', 'Course Setup Recap']
+        files = make_files('course ep 1 setup.mp4', 'course setup recap.mp4')
+        matches = self.mixin.process_local_files(files, videos)
+
+        self.assertEqual(
+            [
+                [c['original_name'] for c in self.mixin.rank_candidates(match, files, matches)]
+                for match in matches
+            ],
+            [['course setup recap.mp4'], ['course ep 1 setup.mp4']]
+        )
+
+
+class ChunkedOrdinalMatchingTests(TestCase):
+    @override_settings(RENAME_JOB_CHUNK_SIZE=2)
+    def test_duplicate_ordinal_in_another_chunk_is_a_conflict(self):
+        videos = ['Lecture Part 1 - Intro', 'Lecture Part 2 - Basics', 'Lab Part 1 - Intro']
+        files = make_files('lecture part 1 intro.mp4', 'lecture part 2 basics.mp4')
+        job = RenameJob.objects.create(
+            playlist_url='PLtest', selected_files=files, snapshot=PlaylistSnapshot.store(videos)
+        )
+
+        LocalRenameMixin()._process_job_background(job.id, None)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'completed')
+        methods = {match['video_index']: match['method'] for match in job.matches}
+        self.assertEqual(methods[1], 'ordinal')
+        self.assertEqual(methods[0], 'fuzzy')
+        self.assertNotEqual(methods.get(2), 'ordinal')
+
+
+class VideoCandidatesViewTests(TestCase):
+    def test_ordinal_match_gets_alternatives_on_request(self):
+        videos = ['Course Episode 1 - Setup', 'Course Setup Recap']
+        files = make_files('course ep 1 setup.mp4', 'course setup recap.mp4')
+        job = RenameJob.objects.create(
+            playlist_url='PLtest', selected_files=files, status='completed',
+            matches=LocalRenameMixin().process_local_files(files, videos)
+        )
+
+        response = self.client.get(f'/api/jobs/{job.job_id}/videos/0/candidates/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['match']['original_name'], 'course ep 1 setup.mp4')
+        self.assertEqual(
+            [c['original_name'] for c in response.json()['candidates']],
+            ['course setup recap.mp4']
+        )
+
+
+class RematchTests(SimpleTestCase):
+    def setUp(self):
+        self.mixin = LocalRenameMixin()
+
+    def test_insert_remove_and_renumber(self):
+        old_videos = ['Morning Coffee Jazz', 'Rainy Day Blues', 'Sunset Boulevard Swing', 'Midnight Train Ride']
+        old_files = make_files('morning coffee jazz.mp3', 'rainy day blues.mp3', 'sunset boulevard swing.mp3')
+        old_matches = self.mixin.process_local_files(old_files, old_videos)
+        self.assertEqual(len(old_matches), 3)
+
+        # One video inserted at the front, one removed, one file added
+        videos = ['Autumn Leaves Waltz', 'Morning Coffee Jazz', 'Sunset Boulevard Swing', 'Midnight Train Ride']
+        files = old_files + make_files('midnight train ride.mp3', 'autumn leaves waltz.mp3')
+
+        with mock.patch.object(
+            self.mixin, 'calculate_similarity_score', wraps=self.mixin.calculate_similarity_score
+        ) as score:
+            matches, summary = self.mixin.rematch(old_videos, old_files, old_matches, videos, files)
+
+        self.assertEqual(
+            [(match['video_index'], match['original_name'], match['suggested_name']) for match in matches],
+            [
+                (0, 'autumn leaves waltz.mp3', '001 - Autumn Leaves Waltz'),
+                (1, 'morning coffee jazz.mp3', '002 - Morning Coffee Jazz'),
+                (2, 'sunset boulevard swing.mp3', '003 - Sunset Boulevard Swing'),
+                (3, 'midnight train ride.mp3', '004 - Midnight Train Ride'),
+            ]
+        )
+        self.assertEqual(summary, {
+            'videos_added': 1,
+            'videos_removed': 1,
+            'files_added': 2,
+            'files_removed': 0,
+            'matches_reused': 2,
+            'videos_scored': 2
+        })
+
+        # The unchanged, unmatched video is only scored against added files
+        scored = {}
+        for call in score.call_args_list:
+            scored.setdefault(call.args[0], set()).add(call.args[1])
+        self.assertEqual(scored['Midnight Train Ride'], {'midnight train ride.mp3', 'autumn leaves waltz.mp3'})
+        self.assertEqual(
+            scored['Autumn Leaves Waltz'],
+            {'rainy day blues.mp3', 'midnight train ride.mp3', 'autumn leaves waltz.mp3'}
+        )
+        self.assertNotIn('Morning Coffee Jazz', scored)
+
+
+class JobLifecycleTests(TestCase):
+    def make_job(self, heartbeat_age=0, **fields):
+        return RenameJob.objects.create(
+            playlist_url='PLtest',
+            selected_files=make_files('a.mp4'),
+            heartbeat_at=timezone.now() - timedelta(seconds=heartbeat_age),
+            **fields
+        )
+
+    def test_cancel_running_job_only_requests_it(self):
+        job = self.make_job(status='processing')
+
+        response = self.client.post(f'/api/jobs/{job.job_id}/cancel/')
+
+        job.refresh_from_db()
+        self.assertEqual(response.json()['message'], 'Cancellation requested')
+        self.assertEqual((job.status, job.cancel_requested), ('processing', True))
+
+    @override_settings(RENAME_JOB_STALE_SECONDS=60)
+    def test_cancel_orphaned_job_cancels_it(self):
+        job = self.make_job(heartbeat_age=120, status='processing')
+
+        response = self.client.post(f'/api/jobs/{job.job_id}/cancel/')
+
+        job.refresh_from_db()
+        self.assertEqual(response.json()['message'], 'Job cancelled')
+        self.assertEqual(job.status, 'cancelled')
+
+    @override_settings(RENAME_JOB_STALE_SECONDS=60)
+    def test_resume_claims_job_once(self):
+        running = self.make_job(status='processing', snapshot=PlaylistSnapshot.store(['a']))
+        orphaned = self.make_job(heartbeat_age=120, status='processing', snapshot=PlaylistSnapshot.store(['a']))
+
+        with mock.patch.object(LocalRenameMixin, 'start_job_thread') as start:
+            self.assertEqual(self.client.post(f'/api/jobs/{running.job_id}/resume/').status_code, 409)
+            self.assertEqual(self.client.post(f'/api/jobs/{orphaned.job_id}/resume/').status_code, 200)
+            self.assertEqual(self.client.post(f'/api/jobs/{orphaned.job_id}/resume/').status_code, 409)
+
+        start.assert_called_once_with(orphaned.id, mock.ANY)
+
+    def test_worker_cancelled_meanwhile_does_not_complete(self):
+        job = self.make_job(snapshot=PlaylistSnapshot.store(['a']))
+        mixin = LocalRenameMixin()
+
+        def cancel_then_complete(job_, *args, **kwargs):
+            RenameJob.objects.filter(id=job_.id).update(cancel_requested=True)
+            return LocalRenameMixin._complete_job(mixin, job_, *args, **kwargs)
+
+        with mock.patch.object(mixin, '_complete_job', side_effect=cancel_then_complete):
+            mixin._process_job_background(job.id, None)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'cancelled')
+
+
+class RetentionTests(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+
+    def cache_entry(self, playlist_id, size_bytes, used_hours_ago=None, expired_days_ago=-1):
+        return YouTubeCache.objects.create(
+            playlist_id=playlist_id,
+            snapshot=PlaylistSnapshot.store([playlist_id]),
+            expires_at=self.now - timedelta(days=expired_days_ago),
+            last_used_at=None if used_hours_ago is None else self.now - timedelta(hours=used_hours_ago),
+            size_bytes=size_bytes
+        )
+
+    def finished_job(self, days_old, **fields):
+        job = RenameJob.objects.create(
+            playlist_url='PLtest', status='completed', matches=[{'video_index': 0}],
+            rename_commands=[{'new_name': 'x'}], snapshot=PlaylistSnapshot.store(['a']), **fields
+        )
+        RenameJob.objects.filter(id=job.id).update(created_at=self.now - timedelta(days=days_old))
+        return job
+
+    @override_settings(YOUTUBE_CACHE_MAX_BYTES=150, YOUTUBE_CACHE_STALE_DAYS=7)
+    def test_cache_evicts_least_recently_used_first(self):
+        self.cache_entry('PLnever', 100)
+        self.cache_entry('PLold', 100, used_hours_ago=5)
+        self.cache_entry('PLrecent', 100, used_hours_ago=1)
+        self.cache_entry('PLstale', 100, used_hours_ago=0, expired_days_ago=8)
+
+        result = prune_youtube_cache(self.now)
+
+        self.assertEqual(result, {'cache_expired_deleted': 1, 'cache_evicted': 2, 'cache_bytes': 100})
+        self.assertEqual(list(YouTubeCache.objects.values_list('playlist_id', flat=True)), ['PLrecent'])
+
+    @override_settings(RENAME_JOB_ARCHIVE_DAYS=30, RENAME_JOB_DELETE_DAYS=180, RENAME_JOB_MAX_COUNT=3)
+    def test_jobs_are_deleted_before_the_rest_is_archived(self):
+        expired = self.finished_job(200)
+        over_count = self.finished_job(60)
+        archived = self.finished_job(40)
+        recent = [self.finished_job(1), self.finished_job(2)]
+        running = self.finished_job(50)
+        RenameJob.objects.filter(id=running.id).update(status='processing')
+
+        result = prune_rename_jobs(self.now)
+
+        self.assertEqual(result, {'jobs_deleted': 2, 'jobs_archived': 1})
+        remaining = set(RenameJob.objects.values_list('id', flat=True))
+        self.assertFalse({expired.id, over_count.id} & remaining)
+
+        archived.refresh_from_db()
+        self.assertEqual((archived.matches, archived.snapshot_id), ([], None))
+        self.assertEqual(archived.rename_commands, [{'new_name': 'x'}])
+        self.assertIsNotNone(archived.archived_at)
+        for job in recent + [running]:
+            job.refresh_from_db()
+            self.assertIsNone(job.archived_at)
+
+    def test_only_old_unreferenced_snapshots_are_deleted(self):
+        unreferenced = PlaylistSnapshot.store(['gone'])
+        fresh = PlaylistSnapshot.store(['just stored'])
+        cached = self.cache_entry('PLcached', 10).snapshot
+        PlaylistSnapshot.objects.exclude(digest=fresh.digest).update(created_at=self.now - timedelta(hours=2))
+
+        self.assertEqual(prune_snapshots(self.now), {'snapshots_deleted': 1})
+        self.assertEqual(
+            set(PlaylistSnapshot.objects.values_list('digest', flat=True)),
+            {fresh.digest, cached.digest}
+        )
+        self.assertFalse(PlaylistSnapshot.objects.filter(digest=unreferenced.digest).exists())
+
+
+def http_error(status, reason=None):
+    errors = [{'reason': reason}] if reason else []
+    content = json.dumps({'error': {'code': status, 'message': reason or 'error', 'errors': errors}})
+    return HttpError(Response({'status': status}), content.encode())
+
+
+@override_settings(YOUTUBE_DAILY_QUOTA=10, YOUTUBE_MAX_RETRIES=3)
+class YouTubeFetcherTests(TestCase):
+    def setUp(self):
+        with mock.patch('apk.youtube.build'):
+            self.fetcher = YouTubeFetcher('test-key')
+        for patcher in (
+            mock.patch.object(YouTubeFetcher, '_wait_for_rate_limit'),
+            mock.patch('apk.youtube.time.sleep'),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def execute(self, *outcomes):
+        request = mock.Mock()
+        request.execute.side_effect = outcomes
+        return request
+
+    def used(self):
+        return YouTubeFetcher.quota_status('test-key')['used']
+
+    def test_transient_errors_are_retried_with_jittered_backoff(self):
+        request = self.execute(http_error(503), http_error(403, 'rateLimitExceeded'), {'items': []})
+
+        with mock.patch('apk.youtube.random.uniform', side_effect=lambda low, high: high) as uniform:
+            self.assertEqual(self.fetcher._execute(request, 1), {'items': []})
+
+        self.assertEqual([call.args for call in uniform.call_args_list], [(0, 1.0), (0, 2.0)])
+        self.assertEqual(self.used(), 3)
+
+    def test_backoff_is_capped(self):
+        request = self.execute(*[http_error(500)] * 3, {'items': []})
+
+        with mock.patch.object(YouTubeFetcher, 'BACKOFF_CAP', 1.5), \
+                mock.patch('apk.youtube.random.uniform', side_effect=lambda low, high: high) as uniform:
+            self.fetcher._execute(request, 1)
+
+        self.assertEqual([call.args[1] for call in uniform.call_args_list], [1.0, 1.5, 1.5])
+
+    def test_gives_up_after_max_retries(self):
+        request = self.execute(*[http_error(503)] * 5)
+
+        with self.assertRaises(HttpError):
+            self.fetcher._execute(request, 1)
+        self.assertEqual(request.execute.call_count, 4)
+
+    def test_other_errors_are_not_retried(self):
+        request = self.execute(http_error(404, 'playlistNotFound'))
+
+        with self.assertRaises(HttpError):
+            self.fetcher._execute(request, 1)
+        self.assertEqual(request.execute.call_count, 1)
+
+    def test_quota_exceeded_uses_up_the_budget(self):
+        request = self.execute(http_error(403, 'quotaExceeded'))
+
+        with self.assertRaises(QuotaExceeded):
+            self.fetcher._execute(request, 1)
+        self.assertEqual(YouTubeFetcher.quota_status('test-key')['remaining'], 0)
+
+    def test_requests_beyond_the_budget_are_not_sent(self):
+        request = self.execute(*[{'items': []}] * 3)
+
+        self.fetcher._execute(request, 4)
+        self.fetcher._execute(request, 4)
+        with self.assertRaises(QuotaExceeded):
+            self.fetcher._execute(request, 4)
+
+        self.assertEqual(request.execute.call_count, 2)
+        self.assertEqual(self.used(), 8)
+
+
+class ColumnarRendererTests(SimpleTestCase):
+    def test_matches_keep_their_candidates(self):
+        matches = [
+            {
+                'video_index': 0, 'video_title': 'Intro', 'file_path': '/a.mp4', 'original_name': 'a.mp4',
+                'score': 0.9, 'method': 'fuzzy', 'suggested_name': '001 - Intro', 'details': {},
+                'candidates': [
+                    {'file_path': '/b.mp4', 'original_name': 'b.mp4', 'score': 0.5},
+                    {'file_path': '/c.mp4', 'original_name': 'c.mp4', 'score': 0.4},
+                ]
+            },
+            {
+                'video_index': 1, 'video_title': 'Outro', 'file_path': '/b.mp4', 'original_name': 'b.mp4',
+                'score': 0.8, 'method': 'ordinal', 'suggested_name': '002 - Outro', 'details': {},
+                'candidates': []
+            },
+        ]
+
+        data = to_columnar({'matches': matches})
+
+        self.assertEqual(data['paths'], ['/a.mp4', '/b.mp4', '/c.mp4'])
+        self.assertEqual(data['matches']['path'], [0, 1])
+        self.assertEqual(data['matches']['candidates'], {
+            'path': [[1, 2], []],
+            'original_name': [['b.mp4', 'c.mp4'], []],
+            'score': [[0.5, 0.4], []],
+        })
+        self.assertEqual(
+            json.loads(ColumnarJSONRenderer().render({'matches': matches}))['matches']['candidates']['path'],
+            [[1, 2], []]
+        )
+
+
+@override_settings(PLAYLIST_PREFETCH_LEAD_HOURS=2, WATCHED_PLAYLIST_RECENT_DAYS=7, PLAYLIST_PREFETCH_CLAIM_SECONDS=300)
+class PrefetchTests(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+
+    def watch(self, playlist_id, used_days_ago=0, explicit=False, expires_in_hours=None, videos=10):
+        WatchedPlaylist.objects.create(
+            playlist_id=playlist_id, explicit=explicit,
+            last_used_at=self.now - timedelta(days=used_days_ago)
+        )
+        if expires_in_hours is not None:
+            YouTubeCache.objects.create(
+                playlist_id=playlist_id,
+                snapshot=PlaylistSnapshot.store([f'{playlist_id} {i}' for i in range(videos)]),
+                expires_at=self.now + timedelta(hours=expires_in_hours)
+            )
+
+    def test_due_playlists_most_urgent_first(self):
+        self.watch('PLexpiring', expires_in_hours=1, videos=120)
+        self.watch('PLsoonest', expires_in_hours=0.5)
+        self.watch('PLuncached', explicit=True, used_days_ago=30)
+        self.watch('PLfresh', expires_in_hours=20)
+        self.watch('PLforgotten', used_days_ago=30, expires_in_hours=1)
+
+        self.assertEqual(
+            due_playlists(self.now),
+            [('PLuncached', 1), ('PLsoonest', 1), ('PLexpiring', 3)]
+        )
+
+    def test_claim_playlist_once_per_claim_period(self):
+        self.watch('PLwatched')
+
+        self.assertTrue(claim_playlist('PLwatched', self.now))
+        self.assertFalse(claim_playlist('PLwatched', self.now + timedelta(seconds=60)))
+        self.assertTrue(claim_playlist('PLwatched', self.now + timedelta(seconds=301)))
+        self.assertFalse(claim_playlist('PLunknown', self.now))
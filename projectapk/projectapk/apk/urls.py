@@ -9,9 +9,14 @@ urlpatterns = [
     path('api/jobs/', views.LocalJobsListView.as_view(), name='list-jobs'),
     path('api/jobs/<uuid:job_id>/', views.JobStatusView.as_view(), name='job-status'),
     path('api/jobs/<uuid:job_id>/status/', views.JobStatusView.as_view(), name='job-status-alt'),
+    path('api/jobs/<uuid:job_id>/cancel/', views.CancelJobView.as_view(), name='cancel-job'),
+    path('api/jobs/<uuid:job_id>/resume/', views.ResumeJobView.as_view(), name='resume-job'),
+    path('api/jobs/<uuid:job_id>/rematch/', views.RematchJobView.as_view(), name='rematch-job'),
+    path('api/jobs/<uuid:job_id>/videos/<int:video_index>/candidates/', views.VideoCandidatesView.as_view(), name='video-candidates'),
     
     # YouTube operations
     path('api/youtube/', views.YouTubeAPIView.as_view(), name='youtube-api'),
+    path('api/watched/', views.WatchedPlaylistsView.as_view(), name='watched-playlists'),
     
     # Preview & Analysis
     path('api/analyze/', views.FileAnalysisView.as_view(), name='analyze-files'),
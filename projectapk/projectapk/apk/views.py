@@ -1,16 +1,22 @@
 
 import json
-import threading
+import bisect
 from pathlib import Path
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework.settings import api_settings
 from django.shortcuts import get_object_or_404
 from django.conf import settings
 from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
 from .mixins import LocalRenameMixin
+from .prefetch import due_playlists, note_playlist_use, watched_playlists
+from .renderers import COLUMNAR_RENDERERS
+from .youtube import YouTubeFetcher
 
-from .models import RenameJob, YouTubeCache
+from .models import RenameJob, WatchedPlaylist, YouTubeCache
 
 class StartRenameJobView(LocalRenameMixin, APIView):
     """Start a rename job - main endpoint"""
@@ -51,11 +57,8 @@ class StartRenameJobView(LocalRenameMixin, APIView):
         )
         
         # Process in background thread (but still local)
-        threading.Thread(
-            target=self._process_job_background,
-            args=(job.id, api_key),
-            daemon=True
-        ).start()
+        self.start_job_thread(job.id, api_key)
+        note_playlist_use(self.get_playlist_id(playlist_url), api_key)
         
         return Response({
             'success': True,
@@ -64,52 +67,13 @@ class StartRenameJobView(LocalRenameMixin, APIView):
             'status_endpoint': f'/api/jobs/{job.job_id}/status/'
         })
 
-    def _process_job_background(self, job_id, api_key):
-        """Process job in background thread"""
-        try:
-            job = RenameJob.objects.get(id=job_id)
-            job.status = 'processing'
-            job.save()
-            
-            # Get playlist videos
-            videos = self.get_playlist_videos_local(api_key, job.playlist_url)
-            
-            # Match files to videos
-            matches = self.process_local_files(job.selected_files, videos)
-            
-            # Prepare rename commands for Flutter
-            rename_commands = []
-            for match in matches:
-                rename_commands.append({
-                    'original_path': match['file_path'],
-                    'new_name': match['suggested_name'],
-                    'video_title': match['video_title'],
-                    'confidence': match['score']
-                })
-            
-            # Update job
-            job.status = 'completed'
-            job.video_titles = videos
-            job.matches = matches
-            job.rename_commands = rename_commands
-            job.statistics = {
-                'total_files': len(job.selected_files),
-                'total_videos': len(videos),
-                'matches_found': len(matches),
-                'success_rate': len(matches) / len(job.selected_files) if job.selected_files else 0
-            }
-            job.save()
-            
-        except Exception as e:
-            job = RenameJob.objects.get(id=job_id)
-            job.status = 'failed'
-            job.statistics = {'error': str(e)}
-            job.save()
-
 
 class JobStatusView(APIView):
     """Check job status"""
     
+    # Also serves the compact columnar format (?format=columnar / msgpack)
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES + COLUMNAR_RENDERERS
+    
     def get(self, request, job_id):
         job = get_object_or_404(RenameJob, job_id=job_id)
         
@@ -119,7 +83,13 @@ class JobStatusView(APIView):
             'created_at': job.created_at,
             'completed_at': job.completed_at,
             'statistics': job.statistics,
-            'playlist_url': job.playlist_url
+            'playlist_url': job.playlist_url,
+            'progress': {
+                'processed_videos': job.next_video_index,
+                'total_videos': job.video_count,
+                'matches_so_far': len(job.matches)
+            },
+            'cancel_requested': job.cancel_requested
         }
         
         if job.status == 'completed':
@@ -130,6 +100,155 @@ class JobStatusView(APIView):
         return Response(response_data)
 
 
+class VideoCandidatesView(LocalRenameMixin, APIView):
+    """Suggested file and next best alternatives for one playlist video"""
+    
+    def get(self, request, job_id, video_index):
+        job = get_object_or_404(RenameJob, job_id=job_id)
+        
+        # Matches are stored in playlist order
+        position = bisect.bisect_left(job.matches, video_index, key=lambda match: match['video_index'])
+        if position == len(job.matches) or job.matches[position]['video_index'] != video_index:
+            return Response(
+                {'error': 'No match for this video'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        match = job.matches[position]
+        return Response({
+            'job_id': str(job.job_id),
+            'video_index': video_index,
+            'video_title': match['video_title'],
+            'match': {
+                'original_name': match['original_name'],
+                'file_path': match['file_path'],
+                'score': match['score'],
+                'suggested_name': match['suggested_name']
+            },
+            'candidates': self.rank_candidates(match, job.selected_files, job.matches)
+        })
+
+
+class CancelJobView(LocalRenameMixin, APIView):
+    """
+    Cancel a job. Its worker, in whichever server process runs it, stops
+    at the next chunk boundary or before saving its results. A job whose
+    worker is gone is cancelled right away.
+    """
+    
+    def post(self, request, job_id):
+        job = get_object_or_404(RenameJob, job_id=job_id)
+        
+        # Conditional, the job may finish between the read and the update
+        requested = RenameJob.objects.filter(
+            id=job.id, status__in=('pending', 'processing')
+        ).update(cancel_requested=True)
+        
+        if not requested:
+            job.refresh_from_db(fields=['status'])
+            return Response(
+                {'error': f'Job is already {job.status}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        cancelled = RenameJob.objects.filter(self.orphaned_jobs(), id=job.id).update(status='cancelled')
+        
+        return Response({
+            'success': True,
+            'job_id': str(job.job_id),
+            'message': 'Job cancelled' if cancelled else 'Cancellation requested'
+        })
+
+
+class ResumeJobView(LocalRenameMixin, APIView):
+    """Resume an interrupted, failed or cancelled job from its last checkpoint"""
+    
+    def post(self, request, job_id):
+        job = get_object_or_404(RenameJob, job_id=job_id)
+        
+        if job.status == 'completed':
+            return Response(
+                {'error': 'Job is already completed'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if job.archived_at:
+            return Response(
+                {'error': 'Job has been archived and can no longer be resumed'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # The API key is only needed if the playlist was never fetched
+        api_key = request.data.get('youtube_api_key') or self.get_youtube_api_key()
+        if not job.snapshot_id and not api_key:
+            return Response(
+                {'error': 'YouTube API key required. Please provide one.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Claimed in one UPDATE, so concurrent requests to different server
+        # processes cannot start two workers
+        claimed = RenameJob.objects.filter(
+            Q(status__in=('failed', 'cancelled')) | self.orphaned_jobs(), id=job.id
+        ).update(status='pending', cancel_requested=False, heartbeat_at=timezone.now())
+        if not claimed:
+            return Response(
+                {'error': 'Job is still running'},
+                status=status.HTTP_409_CONFLICT
+            )
+        
+        self.start_job_thread(job.id, api_key)
+        
+        return Response({
+            'success': True,
+            'job_id': str(job.job_id),
+            'message': f'Job resumed from video {job.next_video_index}',
+            'status_endpoint': f'/api/jobs/{job.job_id}/status/'
+        })
+
+
+class RematchJobView(LocalRenameMixin, APIView):
+    """Re-run a completed job against the current playlist, scoring only what changed"""
+    
+    def post(self, request, job_id):
+        job = get_object_or_404(RenameJob, job_id=job_id)
+        
+        if job.status != 'completed' or job.archived_at:
+            return Response(
+                {'error': 'Only completed, non-archived jobs can be rematched'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        api_key = request.data.get('youtube_api_key') or self.get_youtube_api_key()
+        if not api_key:
+            return Response(
+                {'error': 'YouTube API key required. Please provide one.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Optional new file list, the stored one is used otherwise
+        selected_files = request.data.get('selected_files')
+        
+        claimed = RenameJob.objects.filter(
+            id=job.id, status='completed', archived_at__isnull=True
+        ).update(status='processing', cancel_requested=False, heartbeat_at=timezone.now())
+        if not claimed:
+            return Response(
+                {'error': 'Job is still running'},
+                status=status.HTTP_409_CONFLICT
+            )
+        
+        self.start_rematch_thread(job.id, api_key, selected_files)
+        note_playlist_use(self.get_playlist_id(job.playlist_url), api_key)
+        
+        return Response({
+            'success': True,
+            'job_id': str(job.job_id),
+            'message': 'Rematch started',
+            'status_endpoint': f'/api/jobs/{job.job_id}/status/'
+        })
+
+
 class YouTubeAPIView(LocalRenameMixin, APIView):
     """Direct YouTube API operations"""
     
@@ -165,6 +284,12 @@ class YouTubeAPIView(LocalRenameMixin, APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
         
+        elif action == 'quota_status':
+            return Response({
+                'success': True,
+                'quota': YouTubeFetcher.quota_status(api_key)
+            })
+        
         elif action == 'save_api_key':
             # Save API key locally
             api_key = request.data.get('api_key')
@@ -248,6 +373,7 @@ class QuickPreviewView(LocalRenameMixin, APIView):
         try:
             # Get videos
             videos = self.get_playlist_videos_local(api_key, playlist_url, use_cache=True)
+            note_playlist_use(self.get_playlist_id(playlist_url), api_key)
             
             # Find matches for preview
             preview_matches = []
@@ -285,8 +411,59 @@ class LocalJobsListView(generics.ListAPIView):
     from .models import RenameJob
     from .serializer import RenameJobSerializer
     
-    queryset = RenameJob.objects.all().order_by('-created_at')
+    # video_titles reads each job's snapshot
+    queryset = RenameJob.objects.select_related('snapshot').order_by('-created_at')
     serializer_class = RenameJobSerializer
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES + COLUMNAR_RENDERERS
+
+
+class WatchedPlaylistsView(LocalRenameMixin, APIView):
+    """Playlists kept warm by the prefetch scheduler"""
+    
+    def get(self, request):
+        due = {playlist_id for playlist_id, _ in due_playlists()}
+        expires = dict(YouTubeCache.objects.values_list('playlist_id', 'expires_at'))
+        
+        return Response({
+            'watched': [
+                {
+                    'playlist_id': watched.playlist_id,
+                    'explicit': watched.explicit,
+                    'last_used_at': watched.last_used_at,
+                    'last_refreshed_at': watched.last_refreshed_at,
+                    'cache_expires_at': expires.get(watched.playlist_id),
+                    'refresh_due': watched.playlist_id in due
+                }
+                for watched in watched_playlists().order_by('playlist_id')
+            ]
+        })
+    
+    def post(self, request):
+        playlist_url = request.data.get('playlist_url')
+        if not playlist_url:
+            return Response(
+                {'error': 'Playlist URL required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        playlist_id = self.get_playlist_id(playlist_url)
+        WatchedPlaylist.objects.update_or_create(playlist_id=playlist_id, defaults={'explicit': True})
+        note_playlist_use(playlist_id, request.data.get('api_key'))
+        
+        return Response({'success': True, 'playlist_id': playlist_id})
+    
+    def delete(self, request):
+        playlist_url = request.data.get('playlist_url')
+        if not playlist_url:
+            return Response(
+                {'error': 'Playlist URL required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        playlist_id = self.get_playlist_id(playlist_url)
+        deleted, _ = WatchedPlaylist.objects.filter(playlist_id=playlist_id).delete()
+        
+        return Response({'success': bool(deleted), 'playlist_id': playlist_id})
 
 
 # ============================================================================
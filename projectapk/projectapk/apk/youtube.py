@@ -0,0 +1,143 @@
+# youtube.py
+import hashlib
+import random
+import threading
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from django.conf import settings
+from django.db.models import F
+from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from .models import YouTubeQuotaUsage
+
+QUOTA_TIMEZONE = ZoneInfo('America/Los_Angeles')
+
+
+class QuotaExceeded(Exception):
+    """The daily quota budget of an API key is used up"""
+
+
+class YouTubeFetcher:
+    """
+    Thin layer over the YouTube Data API that asks only for the fields we
+    use, accounts quota units per API key, rate limits requests and retries
+    transient failures with jittered exponential backoff.
+    """
+
+    PLAYLIST_ITEMS_COST = 1
+    PLAYLIST_ITEMS_FIELDS = 'nextPageToken,items(snippet(title))'
+
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+    RETRY_REASONS = {'rateLimitExceeded', 'userRateLimitExceeded', 'backendError'}
+    BACKOFF_BASE = 1.0
+    BACKOFF_CAP = 32.0
+
+    # Shared by all fetchers of this process
+    _rate_lock = threading.Lock()
+    _next_request_at = 0.0
+
+    def __init__(self, api_key):
+        self.key_hash = hashlib.sha256(api_key.encode()).hexdigest()
+        endpoint = getattr(settings, 'YOUTUBE_API_ENDPOINT', None)
+        self.youtube = build(
+            'youtube', 'v3',
+            developerKey=api_key,
+            client_options={'api_endpoint': endpoint} if endpoint else None
+        )
+
+    @staticmethod
+    def quota_day():
+        return datetime.now(QUOTA_TIMEZONE).date()
+
+    @classmethod
+    def quota_status(cls, api_key):
+        key_hash = hashlib.sha256(api_key.encode()).hexdigest()
+        usage = YouTubeQuotaUsage.objects.filter(key_hash=key_hash, day=cls.quota_day()).first()
+        used = usage.units if usage else 0
+        budget = getattr(settings, 'YOUTUBE_DAILY_QUOTA', 10000)
+        return {
+            'day': str(cls.quota_day()),
+            'used': used,
+            'budget': budget,
+            'remaining': max(budget - used, 0)
+        }
+
+    def iter_playlist_titles(self, playlist_id):
+        """Yield the video titles of a playlist one page at a time"""
+        nextPageToken = None
+
+        while True:
+            pl_request = self.youtube.playlistItems().list(
+                part='snippet',
+                playlistId=playlist_id,
+                maxResults=50,
+                pageToken=nextPageToken,
+                fields=self.PLAYLIST_ITEMS_FIELDS
+            )
+            pl_response = self._execute(pl_request, self.PLAYLIST_ITEMS_COST)
+
+            yield [item['snippet']['title'] for item in pl_response.get('items', [])]
+
+            nextPageToken = pl_response.get('nextPageToken')
+            if not nextPageToken:
+                break
+
+    def _execute(self, request, cost):
+        max_retries = getattr(settings, 'YOUTUBE_MAX_RETRIES', 5)
+        attempt = 0
+
+        while True:
+            self._charge_quota(cost)
+            self._wait_for_rate_limit()
+            try:
+                return request.execute()
+            except HttpError as e:
+                reasons = self._error_reasons(e)
+                if 'quotaExceeded' in reasons or 'dailyLimitExceeded' in reasons:
+                    self._exhaust_quota()
+                    raise QuotaExceeded('YouTube API quota exceeded for this key') from e
+                retryable = e.status_code in self.RETRY_STATUSES or reasons & self.RETRY_REASONS
+                if not retryable or attempt >= max_retries:
+                    raise
+            except OSError:
+                # Socket timeouts and dropped connections
+                if attempt >= max_retries:
+                    raise
+
+            # Full jitter: sleep anywhere up to the exponential ceiling
+            time.sleep(random.uniform(0, min(self.BACKOFF_CAP, self.BACKOFF_BASE * 2 ** attempt)))
+            attempt += 1
+
+    @staticmethod
+    def _error_reasons(error):
+        details = error.error_details
+        if not isinstance(details, list):
+            return set()
+        return {detail.get('reason') for detail in details if isinstance(detail, dict)}
+
+    def _wait_for_rate_limit(self):
+        interval = 1.0 / getattr(settings, 'YOUTUBE_REQUESTS_PER_SECOND', 5)
+        with self._rate_lock:
+            now = time.monotonic()
+            wait = YouTubeFetcher._next_request_at - now
+            YouTubeFetcher._next_request_at = max(now, YouTubeFetcher._next_request_at) + interval
+        if wait > 0:
+            time.sleep(wait)
+
+    def _charge_quota(self, units):
+        budget = getattr(settings, 'YOUTUBE_DAILY_QUOTA', 10000)
+        day = self.quota_day()
+        YouTubeQuotaUsage.objects.get_or_create(key_hash=self.key_hash, day=day)
+
+        # Check and charge in one UPDATE (see DATABASES in settings)
+        charged = YouTubeQuotaUsage.objects.filter(
+            key_hash=self.key_hash, day=day, units__lte=budget - units
+        ).update(units=F('units') + units)
+        if not charged:
+            raise QuotaExceeded('YouTube API quota budget used up for today')
+
+    def _exhaust_quota(self):
+        YouTubeQuotaUsage.objects.filter(key_hash=self.key_hash, day=self.quota_day()).update(
+            units=getattr(settings, 'YOUTUBE_DAILY_QUOTA', 10000)
+        )
@@ -0,0 +1,383 @@
+#!/usr/bin/env python
+"""
+Load test for the local REST API.
+
+Starts a stub YouTube Data API server, optionally starts the Django server
+(runserver, gunicorn for WSGI or uvicorn for ASGI) pointed at that stub, and
+drives it with scripted client profiles: job submit storms, status polling,
+previews, analysis, job lists and health checks. Reports p50/p95/p99 latency,
+throughput and error rate per endpoint of apk/urls.py.
+
+Examples:
+    python loadtest.py --spawn runserver --duration 30
+    python loadtest.py --spawn wsgi --storm 50 --poll-hz 10
+    python loadtest.py --url http://127.0.0.1:8000   # server started by hand
+
+A spawned server uses a throwaway SQLite database, migrated at startup and
+deleted afterwards. A server started by hand must run with
+YOUTUBE_API_ENDPOINT set to the stub URL printed at startup (use --stub-port
+to fix the port), and should get its own database through PROJECTAPK_DB, as
+the test leaves its jobs behind.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.error import HTTPError, URLError
+from urllib.parse import parse_qs, urlparse
+from urllib.request import Request, urlopen
+
+BASE_DIR = Path(__file__).resolve().parent
+
+
+# ============================================================================
+# STUB YOUTUBE SERVER
+# ============================================================================
+
+def stub_title(playlist_id, index):
+    return f"{playlist_id} Episode {index + 1} - Stub video number {index + 1}"
+
+
+class StubYouTubeHandler(BaseHTTPRequestHandler):
+    """Serves playlistItems.list pages with generated titles"""
+
+    videos_per_playlist = 200
+    latency = 0.05
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if not url.path.rstrip('/').endswith('playlistItems'):
+            self.send_error(404)
+            return
+
+        query = parse_qs(url.query)
+        playlist_id = query.get('playlistId', [''])[0]
+        start = int(query.get('pageToken', ['0'])[0] or 0)
+        end = min(start + int(query.get('maxResults', ['50'])[0]), self.videos_per_playlist)
+
+        body = {'items': [
+            {'snippet': {'title': stub_title(playlist_id, i)}} for i in range(start, end)
+        ]}
+        if end < self.videos_per_playlist:
+            body['nextPageToken'] = str(end)
+
+        time.sleep(self.latency)
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub(port, videos, latency):
+    StubYouTubeHandler.videos_per_playlist = videos
+    StubYouTubeHandler.latency = latency
+    server = ThreadingHTTPServer(('127.0.0.1', port), StubYouTubeHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# ============================================================================
+# SERVER UNDER TEST
+# ============================================================================
+
+def spawn_server(kind, port, stub_url, database):
+    address = f'127.0.0.1:{port}'
+    if kind == 'runserver':
+        command = [sys.executable, 'manage.py', 'runserver', '--noreload', address]
+    elif kind == 'wsgi':
+        command = ['gunicorn', 'projectapk.wsgi:application', '-b', address, '-w', '4', '--threads', '4']
+    elif kind == 'asgi':
+        command = ['uvicorn', 'projectapk.asgi:application', '--host', '127.0.0.1', '--port', str(port)]
+    else:
+        raise ValueError(f'Unknown server kind: {kind}')
+
+    if not shutil.which(command[0]):
+        sys.exit(f'{command[0]} is not installed, cannot start a {kind} server')
+
+    env = dict(os.environ, YOUTUBE_API_ENDPOINT=stub_url, PROJECTAPK_DB=database)
+    subprocess.run(
+        [sys.executable, 'manage.py', 'migrate', '--verbosity', '0'],
+        cwd=BASE_DIR, env=env, check=True,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    return subprocess.Popen(
+        command, cwd=BASE_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+
+def wait_until_up(base_url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urlopen(f'{base_url}/api/health/', timeout=2).read()
+            return True
+        except (URLError, OSError):
+            time.sleep(0.2)
+    return False
+
+
+# ============================================================================
+# CLIENT
+# ============================================================================
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+        # Final status of polled jobs, and seconds from submit to finish
+        self.job_outcomes = {}
+        self.job_durations = {}
+
+    def record(self, endpoint, latency, ok):
+        with self.lock:
+            self.latencies.setdefault(endpoint, []).append(latency)
+            if not ok:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def record_job(self, outcome, duration=None):
+        with self.lock:
+            self.job_outcomes[outcome] = self.job_outcomes.get(outcome, 0) + 1
+            if duration is not None:
+                self.job_durations.setdefault(outcome, []).append(duration)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class LoadClient:
+    def __init__(self, base_url, stats, args):
+        self.base_url = base_url
+        self.stats = stats
+        self.args = args
+        self.api_key = f'loadtest-{uuid.uuid4().hex[:8]}'
+
+    def call(self, endpoint, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        request = Request(
+            self.base_url + path, data=data, method=method,
+            headers={'Content-Type': 'application/json', 'Accept': 'application/json'}
+        )
+        started = time.perf_counter()
+        try:
+            with urlopen(request, timeout=self.args.timeout) as response:
+                payload = response.read()
+                status_code = response.status
+        except HTTPError as e:
+            payload = e.read()
+            status_code = e.code
+        except (URLError, OSError):
+            self.stats.record(endpoint, time.perf_counter() - started, False)
+            return None
+        self.stats.record(endpoint, time.perf_counter() - started, status_code < 400)
+        try:
+            return json.loads(payload)
+        except ValueError:
+            return None
+
+    def playlist_and_files(self):
+        playlist_id = f'PLstub{random.randrange(self.args.playlists)}'
+        indices = random.sample(range(self.args.videos), min(self.args.files, self.args.videos))
+        files = [
+            {'name': f'{stub_title(playlist_id, i).split(" ", 1)[1]}.mp4', 'path': f'/loadtest/{i}.mp4'}
+            for i in indices
+        ]
+        return playlist_id, files
+
+    def submit(self):
+        playlist_id, files = self.playlist_and_files()
+        response = self.call('start-job', 'POST', '/api/jobs/start/', {
+            'playlist_url': f'https://www.youtube.com/playlist?list={playlist_id}',
+            'selected_files': files,
+            'youtube_api_key': self.api_key
+        })
+        return response.get('job_id') if response else None
+
+    def poll(self, job_id, submitted_at, stop):
+        interval = 1.0 / self.args.poll_hz
+        while not stop.is_set():
+            response = self.call('job-status', 'GET', f'/api/jobs/{job_id}/status/')
+            outcome = response.get('status') if response else None
+            if outcome in ('completed', 'failed', 'cancelled'):
+                self.stats.record_job(outcome, time.monotonic() - submitted_at)
+                return
+            stop.wait(interval)
+        self.stats.record_job('unfinished')
+
+    def preview(self):
+        playlist_id, files = self.playlist_and_files()
+        self.call('quick-preview', 'POST', '/api/preview/', {
+            'playlist_url': playlist_id, 'files': files, 'api_key': self.api_key
+        })
+
+    def analyze(self):
+        _, files = self.playlist_and_files()
+        self.call('analyze-files', 'POST', '/api/analyze/', {'files': files})
+
+    def list_jobs(self):
+        self.call('list-jobs', 'GET', '/api/jobs/')
+
+    def health(self):
+        self.call('health-check', 'GET', '/api/health/')
+
+
+def run_at_rate(pool, rate, fn, stop):
+    """Open loop: fire `fn` `rate` times per second, whatever the latency"""
+    if rate <= 0:
+        return
+    interval = 1.0 / rate
+    next_at = time.monotonic()
+    while not stop.is_set():
+        pool.submit(fn)
+        next_at += interval
+        stop.wait(max(0, next_at - time.monotonic()))
+
+
+def run_load(base_url, args):
+    stats = Stats()
+    client = LoadClient(base_url, stats, args)
+    stop = threading.Event()
+    pollers = threading.BoundedSemaphore(args.max_pollers)
+
+    def submit_and_poll():
+        submitted_at = time.monotonic()
+        job_id = client.submit()
+        if not job_id:
+            stats.record_job('not started')
+        elif args.poll_hz > 0 and pollers.acquire(blocking=False):
+            try:
+                client.poll(job_id, submitted_at, stop)
+            finally:
+                pollers.release()
+        else:
+            stats.record_job('not polled')
+
+    profiles = [
+        (args.submit_rate, submit_and_poll),
+        (args.preview_rate, client.preview),
+        (args.analyze_rate, client.analyze),
+        (args.list_rate, client.list_jobs),
+        (args.health_rate, client.health),
+    ]
+
+    workers = args.concurrency + args.max_pollers
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # Submit storm: a burst of concurrent jobs before the steady load
+        for _ in range(args.storm):
+            pool.submit(submit_and_poll)
+
+        drivers = [
+            threading.Thread(target=run_at_rate, args=(pool, rate, fn, stop), daemon=True)
+            for rate, fn in profiles
+        ]
+        started = time.monotonic()
+        for driver in drivers:
+            driver.start()
+        time.sleep(args.duration)
+        stop.set()
+        for driver in drivers:
+            driver.join()
+        elapsed = time.monotonic() - started
+
+    return stats, elapsed
+
+
+def print_report(stats, elapsed):
+    header = f"{'endpoint':<16}{'requests':>10}{'errors':>9}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    print(header)
+    print('-' * len(header))
+    for endpoint, values in sorted(stats.latencies.items()):
+        errors = stats.errors.get(endpoint, 0)
+        print(
+            f"{endpoint:<16}{len(values):>10}{errors / len(values):>8.1%}{len(values) / elapsed:>9.1f}"
+            f"{percentile(values, 50) * 1000:>10.1f}{percentile(values, 95) * 1000:>10.1f}"
+            f"{percentile(values, 99) * 1000:>10.1f}"
+        )
+
+    if not stats.job_outcomes:
+        return
+    print()
+    header = f"{'job outcome':<16}{'jobs':>10}{'share':>9}{'p50 s':>9}{'p95 s':>10}{'max s':>10}"
+    print(header)
+    print('-' * len(header))
+    total = sum(stats.job_outcomes.values())
+    for outcome, count in sorted(stats.job_outcomes.items()):
+        line = f"{outcome:<16}{count:>10}{count / total:>9.1%}"
+        durations = stats.job_durations.get(outcome)
+        if durations:
+            line += f"{percentile(durations, 50):>9.2f}{percentile(durations, 95):>10.2f}{max(durations):>10.2f}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--url', help='Base URL of an already running server')
+    target.add_argument('--spawn', choices=['runserver', 'wsgi', 'asgi'], default='runserver',
+                        help='Server to start for the test (default: runserver)')
+    parser.add_argument('--port', type=int, default=8765, help='Port of the spawned server')
+    parser.add_argument('--stub-port', type=int, default=0, help='Port of the stub YouTube API (default: any)')
+    parser.add_argument('--stub-latency', type=float, default=0.05, help='Seconds per stub page')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds of steady load')
+    parser.add_argument('--storm', type=int, default=10, help='Jobs submitted at once at startup')
+    parser.add_argument('--submit-rate', type=float, default=1, help='Job submits per second')
+    parser.add_argument('--poll-hz', type=float, default=2, help='Status polls per second per job')
+    parser.add_argument('--max-pollers', type=int, default=50, help='Jobs polled at the same time')
+    parser.add_argument('--preview-rate', type=float, default=1, help='Previews per second')
+    parser.add_argument('--analyze-rate', type=float, default=1, help='File analyses per second')
+    parser.add_argument('--list-rate', type=float, default=0.5, help='Job list calls per second')
+    parser.add_argument('--health-rate', type=float, default=1, help='Health checks per second')
+    parser.add_argument('--concurrency', type=int, default=32, help='Client threads for non-polling calls')
+    parser.add_argument('--playlists', type=int, default=5, help='Distinct stub playlists')
+    parser.add_argument('--videos', type=int, default=200, help='Videos per stub playlist')
+    parser.add_argument('--files', type=int, default=100, help='Files per job')
+    parser.add_argument('--timeout', type=float, default=10, help='Client request timeout in seconds')
+    args = parser.parse_args()
+
+    stub = start_stub(args.stub_port, args.videos, args.stub_latency)
+    stub_url = f'http://127.0.0.1:{stub.server_address[1]}/youtube/v3/'
+    print(f'Stub YouTube API at {stub_url}')
+
+    server = None
+    database_dir = None
+    base_url = args.url.rstrip('/') if args.url else f'http://127.0.0.1:{args.port}'
+    if not args.url:
+        database_dir = tempfile.mkdtemp(prefix='loadtest-')
+        server = spawn_server(args.spawn, args.port, stub_url, os.path.join(database_dir, 'db.sqlite3'))
+    try:
+        if not wait_until_up(base_url):
+            sys.exit(f'Server at {base_url} did not come up')
+        print(f'Loading {base_url} for {args.duration:g}s...')
+        stats, elapsed = run_load(base_url, args)
+        print_report(stats, elapsed)
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+        if database_dir:
+            shutil.rmtree(database_dir, ignore_errors=True)
+        stub.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -82,10 +82,15 @@ WSGI_APPLICATION = 'projectapk.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
+# SQLite takes one writer at a time, and a transaction that reads before it
+# writes fails with "database is locked" when another one wrote meanwhile.
+# Rows shared by concurrent requests and workers (jobs, quota, watched
+# playlists) are therefore changed with single conditional UPDATEs.
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        # Overridable for throwaway databases, e.g. the one of loadtest.py
+        'NAME': os.environ.get('PROJECTAPK_DB', BASE_DIR / 'db.sqlite3'),
     }
 }
 
@@ -119,6 +124,51 @@ REST_FRAMEWORK = {
 }
 
 
+# Rename jobs
+# Number of playlist videos matched between two checkpoints of a job
+RENAME_JOB_CHUNK_SIZE = 50
+# Files kept per video (best match plus alternatives offered to the user)
+RENAME_JOB_TOP_K = 5
+# A pending or processing job without a checkpoint for this many seconds
+# has lost its worker and can be cancelled or resumed right away
+RENAME_JOB_STALE_SECONDS = 600
+# Titles and filenames whose cleaned form is kept in memory
+TITLE_FEATURES_CACHE_SIZE = 20000
+
+# YouTube Data API
+# Daily quota units per API key (playlistItems.list costs 1 unit per page)
+YOUTUBE_DAILY_QUOTA = 10000
+YOUTUBE_REQUESTS_PER_SECOND = 5
+# Retries of rate-limited or failed requests, with jittered exponential backoff
+YOUTUBE_MAX_RETRIES = 5
+# Alternative API base URL, e.g. the stub server started by loadtest.py
+YOUTUBE_API_ENDPOINT = os.environ.get('YOUTUBE_API_ENDPOINT')
+
+# Prefetching of watched playlists (`python manage.py prefetch_playlists`)
+# Seconds between runs of the in-process scheduler, 0 disables it
+PLAYLIST_PREFETCH_INTERVAL = 600
+# Cache entries expiring within this many hours are refreshed
+PLAYLIST_PREFETCH_LEAD_HOURS = 2
+# Recently used playlists stay watched for this many days
+WATCHED_PLAYLIST_RECENT_DAYS = 7
+# Daily quota units prefetching always leaves for user jobs
+PLAYLIST_PREFETCH_QUOTA_RESERVE = 2000
+# A playlist claimed for refresh by one server process is skipped by the
+# others for this many seconds
+PLAYLIST_PREFETCH_CLAIM_SECONDS = 300
+
+# Retention, applied by `python manage.py compact_db`
+# Expired YouTube cache entries are kept this long as an offline fallback
+YOUTUBE_CACHE_STALE_DAYS = 7
+# Total size budget of the YouTube cache, least recently used entries go first
+YOUTUBE_CACHE_MAX_BYTES = 50 * 1024 * 1024
+# Finished jobs lose their heavy fields after this many days...
+RENAME_JOB_ARCHIVE_DAYS = 30
+# ...and are deleted after this many days, or when above the count budget
+RENAME_JOB_DELETE_DAYS = 180
+RENAME_JOB_MAX_COUNT = 1000
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/6.0/topics/i18n/
 